@@ -0,0 +1,69 @@
+import json
+import re
+import sys
+import timeit
+from preki_funcutils import status
+from preki_funcutils.cors import DEFAULT_ALLOWED_HOSTS, set_allowed_hosts
+from preki_funcutils.functions import _make_response
+
+ORIGINS = [
+    'https://preki.com',
+    'https://app.preki.com.pa',
+    'https://shop.preki.uy/checkout',
+    'capacitor://localhost',
+    'http://localhost:3000',
+    'https://evil.example.com',
+]
+
+
+def legacy_make_response(origin, stage, body, status_code=status.HTTP_200_OK, allowed_origin=None):
+    if allowed_origin is not None:
+        allowed_origin = f'https://{allowed_origin}'
+
+    is_allowed = bool([
+        host for host in DEFAULT_ALLOWED_HOSTS if re.match(
+            rf'^((http|https|capacitor):\/\/)?([a-zA-Z0-9]*\.)*{re.escape(host)}((\.[a-zA-Z]+)+)?(\/.*)?$', origin)
+    ])
+
+    if not is_allowed:
+        is_localhost = re.match(r'((http|https|capacitor):\/\/)?localhost((:|\/).+)?$', origin)
+        is_allowed = stage == 'dev' and is_localhost
+
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': allowed_origin or (origin if is_allowed else 'http://preki.com'),
+            'Access-Control-Allow-Credentials': True,
+            'Access-Control-Allow-Headers': 'App-Version',
+        },
+        'body': json.dumps(body)
+    }
+
+
+def bench(func, rounds=3000, repeat=5):
+
+    def run():
+        for origin in ORIGINS:
+            func(origin=origin, stage='dev', body={'ok': True})
+
+    return min(timeit.repeat(run, number=rounds, repeat=repeat)) / (rounds * len(ORIGINS))
+
+
+def main():
+    set_allowed_hosts(DEFAULT_ALLOWED_HOSTS)
+    for origin in ORIGINS:
+        for stage in ('dev', 'prod'):
+            legacy = legacy_make_response(origin=origin, stage=stage, body={})
+            current = _make_response(origin=origin, stage=stage, body={})
+            assert legacy['headers'] == current['headers'], origin
+
+    legacy_time, current_time = bench(legacy_make_response), bench(_make_response)
+    print(f'_make_response per call: legacy={legacy_time * 1e6:7.2f}us '
+          f'current={current_time * 1e6:7.2f}us speedup={legacy_time / current_time:5.2f}x')
+
+    return 1 if current_time > legacy_time else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
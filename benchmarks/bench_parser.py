@@ -0,0 +1,58 @@
+import json
+import sys
+import timeit
+from decimal import Decimal
+from preki_funcutils.utils import DecimalEncoder, Parser
+
+
+def legacy_to_number(data):
+    return json.loads(json.dumps(data, cls=DecimalEncoder))
+
+
+def legacy_to_decimal(data):
+    return json.loads(json.dumps(data), parse_float=Decimal)
+
+
+def make_items(count):
+    return [{
+        'id': f'product-{i}',
+        'name': f'Product {i}',
+        'price': Decimal('12.50') + i,
+        'stock': Decimal(i),
+        'tags': ['catalog', 'featured', f'tag-{i % 7}'],
+        'dimensions': {
+            'weight': Decimal('1.25'),
+            'height': Decimal('30'),
+            'active': True,
+            'notes': None,
+        },
+    } for i in range(count)]
+
+
+def bench(func, data, number=5, repeat=5):
+    return min(timeit.repeat(lambda: func(data), number=number, repeat=repeat)) / number
+
+
+def main(count=2000):
+    items = make_items(count)
+    numbers = legacy_to_number(items)
+
+    assert Parser.to_number(items) == legacy_to_number(items)
+    assert Parser.to_decimal(numbers) == legacy_to_decimal(numbers)
+
+    failed = False
+    for name, legacy, current, data in [
+        ('to_number', legacy_to_number, Parser.to_number, items),
+        ('to_decimal', legacy_to_decimal, Parser.to_decimal, numbers),
+    ]:
+        legacy_time, current_time = bench(legacy, data), bench(current, data)
+        speedup = legacy_time / current_time
+        failed = failed or speedup < 1
+        print(f'{name:<12} items={count} json={legacy_time * 1000:8.2f}ms '
+              f'walker={current_time * 1000:8.2f}ms speedup={speedup:5.2f}x')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,117 @@
+import json
+from types import SimpleNamespace
+
+SIZES = {
+    'small': 1,
+    'medium': 10,
+    'large': 100,
+}
+
+
+def make_payload(size):
+    items = [{
+        'sku': f'sku-{i}',
+        'quantity': i % 5 + 1,
+        'price': 12.5 + i,
+        'tags': ['catalog', f'tag-{i % 7}'],
+    } for i in range(size)]
+
+    return {
+        'id': f'order-{size}',
+        'customer': {
+            'id': 1234,
+            'name': 'Jane Doe',
+            'email': 'jane@example.com',
+        },
+        'items': items,
+        'total': 12.5 * size,
+        'paid': True,
+        'notes': None,
+    }
+
+
+def make_context():
+    return SimpleNamespace(function_name='benchmark',
+                           function_version='$LATEST',
+                           get_remaining_time_in_millis=lambda: 900000)
+
+
+def http_event(size):
+    body = json.dumps(make_payload(size))
+
+    def make():
+        return {
+            'path': '/orders/123',
+            'httpMethod': 'POST',
+            'headers': {
+                'origin': 'https://app.preki.com'
+            },
+            'queryStringParameters': {
+                'expand': 'items'
+            },
+            'pathParameters': None,
+            'requestContext': {
+                'stage': 'prod'
+            },
+            'body': body,
+        }
+
+    return make
+
+
+def sqs_event(size):
+    records = [{
+        'messageId': f'message-{i}',
+        'receiptHandle': f'handle-{i}',
+        'eventSource': 'aws:sqs',
+        'eventSourceARN': 'arn:aws:sqs:us-east-1:123456789012:orders',
+        'body': json.dumps(make_payload(10)),
+    } for i in range(size)]
+
+    def make():
+        return {'Records': [dict(r) for r in records]}
+
+    return make
+
+
+def sns_event(size):
+    records = [{
+        'EventSource': 'aws:sns',
+        'Sns': {
+            'MessageId': f'message-{i}',
+            'TopicArn': 'arn:aws:sns:us-east-1:123456789012:orders',
+            'Message': json.dumps(make_payload(10)),
+        },
+    } for i in range(size)]
+
+    def make():
+        return {'Records': [{**r, 'Sns': dict(r['Sns'])} for r in records]}
+
+    return make
+
+
+def dynamodb_event(size):
+    records = [{
+        'eventSource': 'aws:dynamodb',
+        'eventName': 'MODIFY',
+        'dynamodb': {
+            'Keys': {
+                'id': f'order-{i}',
+                'version': i,
+            },
+            'SequenceNumber': f'{i}',
+        },
+    } for i in range(size)]
+
+    def make():
+        return {'Records': [{**r, 'dynamodb': dict(r['dynamodb'])} for r in records]}
+
+    return make
+
+
+EVENTS = {
+    'http': http_event,
+    'sqs': sqs_event,
+    'sns': sns_event,
+    'dynamodb': dynamodb_event,
+}
@@ -0,0 +1,64 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BUDGETS_MS = {
+    'preki_funcutils.functions': 100,
+    'preki_funcutils.logger': 60,
+    'preki_funcutils.boto.dynamodb': 120,
+    'preki_funcutils.boto.sqs': 120,
+    'preki_funcutils.boto.sns': 120,
+    'preki_funcutils.boto.aws_lambda': 120,
+}
+LAZY_MODULES = ['boto3', 'botocore', 'asyncio', 'concurrent.futures', 'logging.handlers']
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module):
+    code = f'import sys, {module}; print(",".join(m for m in {LAZY_MODULES!r} if m in sys.modules))'
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True,
+                            text=True,
+                            cwd=ROOT,
+                            env=env,
+                            check=True)
+
+    cumulative = None
+    for line in result.stderr.splitlines():
+        parts = [p.strip() for p in line.split('|')]
+        if len(parts) == 3 and parts[2] == module:
+            cumulative = int(parts[1]) / 1000
+
+    eager = [m for m in result.stdout.strip().split(',') if m]
+    return cumulative, eager
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold import time budget for preki_funcutils')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--scale', type=float, default=float(os.environ.get('PREKI_IMPORT_BUDGET_SCALE', '1')))
+    args = parser.parse_args()
+
+    failed = False
+    for module, budget in BUDGETS_MS.items():
+        samples, eager = [], []
+        for _ in range(args.runs):
+            cumulative, eager = measure(module)
+            samples.append(cumulative)
+
+        median = statistics.median(samples)
+        over_budget = median > budget * args.scale
+        failed = failed or over_budget or bool(eager)
+        status = 'FAIL' if over_budget or eager else 'ok'
+        print(f'{status:<4} {module:<34} median={median:7.2f}ms budget={budget * args.scale:7.2f}ms'
+              f'{" eager=" + ",".join(eager) if eager else ""}')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
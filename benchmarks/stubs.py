@@ -0,0 +1,122 @@
+from decimal import Decimal
+from types import SimpleNamespace
+from preki_funcutils.boto import connections
+
+
+def make_item(i):
+    return {
+        'id': f'order-{i}',
+        'total': Decimal('12.50') + i,
+        'quantity': Decimal(i % 5 + 1),
+        'tags': ['catalog', f'tag-{i % 7}'],
+        'customer': {
+            'id': Decimal(1234),
+            'name': 'Jane Doe',
+        },
+    }
+
+
+class StubTable:
+
+    def __init__(self, items, page_size=100):
+        self.items = items
+        self.keys = list(items)
+        self.page_size = page_size
+
+    def get_item(self, Key, **kwargs):
+        item = self.items.get(Key['id'])
+        return {'Item': item} if item is not None else {}
+
+    def put_item(self, Item, **kwargs):
+        self.items[Item['id']] = Item
+        return {}
+
+    def update_item(self, Key, **kwargs):
+        return {'Attributes': self.items.get(Key['id'], {})}
+
+    def delete_item(self, Key, **kwargs):
+        return {}
+
+    def _page(self, ExclusiveStartKey=None, Limit=None, **kwargs):
+        start = int(ExclusiveStartKey['id'].split('-')[1]) + 1 if ExclusiveStartKey else 0
+        keys = self.keys[start:start + (Limit or self.page_size)]
+        items = [self.items[k] for k in keys]
+        response = {'Items': items, 'Count': len(items), 'ScannedCount': len(items)}
+        if start + len(items) < len(self.items):
+            response['LastEvaluatedKey'] = {'id': keys[-1]}
+        return response
+
+    def query(self, **kwargs):
+        return self._page(**kwargs)
+
+    def scan(self, **kwargs):
+        return self._page(**kwargs)
+
+
+class StubDynamoDBClient:
+
+    def __init__(self, count=1000):
+        self.tables = {}
+        self.count = count
+
+    def Table(self, name):
+        if name not in self.tables:
+            self.tables[name] = StubTable({f'order-{i}': make_item(i) for i in range(self.count)})
+        return self.tables[name]
+
+    def describe_table(self, TableName):
+        return {'Table': {'KeySchema': [{'AttributeName': 'id', 'KeyType': 'HASH'}]}}
+
+    def get_item(self, TableName, **kwargs):
+        return self.Table(TableName).get_item(**kwargs)
+
+    def put_item(self, TableName, **kwargs):
+        return self.Table(TableName).put_item(**kwargs)
+
+    def update_item(self, TableName, **kwargs):
+        return self.Table(TableName).update_item(**kwargs)
+
+    def delete_item(self, TableName, **kwargs):
+        return self.Table(TableName).delete_item(**kwargs)
+
+    def query(self, TableName, **kwargs):
+        return self.Table(TableName).query(**kwargs)
+
+    def scan(self, TableName, **kwargs):
+        return self.Table(TableName).scan(**kwargs)
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        responses = {}
+        for table_name, request in RequestItems.items():
+            table = self.Table(table_name)
+            responses[table_name] = [table.items[k['id']] for k in request['Keys'] if k['id'] in table.items]
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        for table_name, requests in RequestItems.items():
+            table = self.Table(table_name)
+            for request in requests:
+                if 'PutRequest' in request:
+                    table.put_item(Item=request['PutRequest']['Item'])
+        return {'UnprocessedItems': {}}
+
+
+class StubSQSClient:
+
+    def get_queue_url(self, QueueName):
+        return {'QueueUrl': f'https://sqs.us-east-1.amazonaws.com/123456789012/{QueueName}'}
+
+    def send_message(self, QueueUrl, MessageBody, **kwargs):
+        return {'MessageId': 'message'}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        return {'Successful': [{'Id': e['Id'], 'MessageId': e['Id']} for e in Entries], 'Failed': []}
+
+
+def _resource(client):
+    return SimpleNamespace(meta=SimpleNamespace(client=client))
+
+
+def install(count=1000):
+    connections.set_resource('dynamodb', _resource(StubDynamoDBClient(count)))
+    connections.set_resource('sqs', _resource(StubSQSClient()))
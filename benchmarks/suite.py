@@ -0,0 +1,167 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from preki_funcutils.functions import _make_response, lambda_response
+from preki_funcutils.utils import Parser, parse_message
+from preki_funcutils.boto import dynamodb, sqs
+from .events import EVENTS, SIZES, make_context, make_payload
+from . import stubs
+
+TOLERANCE = float(os.environ.get('PREKI_BENCH_TOLERANCE', '0.5'))
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def _same(value):
+    return lambda: value
+
+
+@lambda_response
+def echo_handler(event, context):
+    return event.get('body')
+
+
+def _query(max_items):
+    return dynamodb.iter_query('orders', 'id = :id', max_items=max_items, page_size=min(max_items, 100))
+
+
+def cases(size):
+    n = SIZES[size]
+    context = make_context()
+
+    for protocol, make_event in EVENTS.items():
+        yield f'lambda_response.{protocol}', make_event(n), lambda e: echo_handler(e, context)
+
+    payload = make_payload(n)
+    body = json.dumps(payload)
+    items = [stubs.make_item(i) for i in range(n * 10)]
+    keys = [{'id': f'order-{i}'} for i in range(n * 10)]
+
+    yield '_make_response', _same(payload), lambda p: _make_response('https://app.preki.com', 'prod', p)
+    yield 'parse_message', _same(body), parse_message
+    yield 'Parser.to_number', _same(items), Parser.to_number
+    yield 'Parser.to_decimal', _same(Parser.to_number(items)), Parser.to_decimal
+    yield 'dynamodb.batch_get_item', _same(keys), lambda k: dynamodb.batch_get_item('orders', k)
+    yield 'dynamodb.batch_write_item', _same(items), lambda i: dynamodb.batch_write_item('orders', PutItems=i)
+    yield 'dynamodb.iter_query', _same(n * 10), _query
+    yield 'sqs.enqueue_messages_batch', _same(items), lambda i: sqs.enqueue_messages_batch('orders', i)
+
+
+def _consume(result):
+    if hasattr(result, '__next__'):
+        for _ in result:
+            pass
+
+
+def _reference():
+    return sorted(str(i * 7919 % 2000) for i in range(2000))
+
+
+def reference_us(iterations=20):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        _reference()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1e6
+
+
+def measure(setup, run, iterations, warmup):
+    for _ in range(warmup):
+        _consume(run(setup()))
+
+    reference = reference_us()
+
+    samples = []
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            arg = setup()
+            start = time.perf_counter()
+            _consume(run(arg))
+            samples.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    samples.sort()
+    p50 = samples[len(samples) // 2] * 1e6
+    p99 = samples[min(int(len(samples) * 0.99), len(samples) - 1)]
+    reference = (reference + reference_us()) / 2
+
+    arg = setup()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    _consume(run(arg))
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    return {
+        'ops_per_sec': len(samples) / sum(samples),
+        'p50_us': p50,
+        'p99_us': p99 * 1e6,
+        'p50_ref': p50 / reference,
+        'peak_kib': peak / 1024,
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+
+        for metric in ('p50_ref', 'peak_kib'):
+            if metric in base and result[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f'{name} {metric} {base[metric]:.3f} -> {result[metric]:.3f}')
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks for the lambda_response hot path and boto helpers')
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES))
+    parser.add_argument('--filter', default='')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=3, help='repeat each case and keep the fastest round')
+    parser.add_argument('--save', help='write results to this baseline file')
+    parser.add_argument('--baseline', default=BASELINE, help='fail if results regress against this baseline file')
+    parser.add_argument('--no-baseline', dest='baseline', action='store_const', const=None)
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    stubs.install()
+
+    results = {}
+    for size in args.sizes:
+        for name, setup, run in cases(size):
+            name = f'{name}[{size}]'
+            if args.filter not in name:
+                continue
+
+            rounds = [measure(setup, run, args.iterations, args.warmup) for _ in range(args.rounds)]
+            result = results[name] = min(rounds, key=lambda r: r['p50_ref'])
+            print(f'{name:<42} {result["ops_per_sec"]:10.1f} ops/s p50={result["p50_us"]:9.1f}us '
+                  f'p99={result["p99_us"]:9.1f}us peak={result["peak_kib"]:8.1f}KiB')
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
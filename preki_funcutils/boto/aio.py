@@ -0,0 +1,50 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+from ..utils import MAX_WORKERS
+from . import aws_lambda, dynamodb, sns, sqs
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='preki-aio')
+    return _executor
+
+
+def to_async(func):
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(_get_executor(), partial(context.run, func, *args, **kwargs))
+
+    return wrapper
+
+
+get_item = to_async(dynamodb.get_item)
+batch_get_item = to_async(dynamodb.batch_get_item)
+batch_write_item = to_async(dynamodb.batch_write_item)
+put_item = to_async(dynamodb.put_item)
+update_item = to_async(dynamodb.update_item)
+delete_item = to_async(dynamodb.delete_item)
+query = to_async(dynamodb.query)
+query_all = to_async(dynamodb.query_all)
+scan = to_async(dynamodb.scan)
+
+enqueue_message = to_async(sqs.enqueue_message)
+enqueue_messages_batch = to_async(sqs.enqueue_messages_batch)
+
+send_topic_message = to_async(sns.send_topic_message)
+send_topic_messages_batch = to_async(sns.send_topic_messages_batch)
+
+call_lambda = to_async(aws_lambda.call_lambda)
+call_lambdas = to_async(aws_lambda.call_lambdas)
@@ -1,14 +1,100 @@
-import boto3
-from ..utils import parse_message, stringify_message
+import contextvars
+import math
+import os
+import time
+from ..exceptions import LambdaInvocationException
+from ..utils import MAX_WORKERS, _capture, parse_message, stringify_message
+from ..metrics import count_items, count_response_retries, instrument
+from .connections import get_client
+from .retry import remaining_time
 
+DEADLINE_MARGIN = float(os.environ.get('PREKI_LAMBDA_DEADLINE_MARGIN', '1'))
 
-def call_lambda(function_name, payload, invocation_type='RequestResponse'):
-    client = boto3.client('lambda')
+
+def _decode_payload(function_name, response, serializer=None):
+    payload = parse_message(response['Payload'].read().decode('utf-8'), serializer=serializer)
+    if response.get('FunctionError'):
+        error = payload if isinstance(payload, dict) else {}
+        raise LambdaInvocationException(error.get('errorMessage') or f'{function_name} failed',
+                                        function_name=function_name,
+                                        error_type=error.get('errorType') or response['FunctionError'],
+                                        payload=payload)
+
+    if isinstance(payload, dict) and isinstance(payload.get('body'), str):
+        return parse_message(payload['body'], serializer=serializer)
+    return payload
+
+
+def _get_client(timeout=None):
+    if timeout is None:
+        return get_client('lambda')
+
+    timeout = max(math.ceil(timeout), 1)
+    config = {'connect_timeout': timeout, 'read_timeout': timeout, 'retries': {'max_attempts': 0}}
+    return get_client('lambda', config=config)
+
+
+@instrument('lambda', items=1)
+def call_lambda(function_name, payload, invocation_type='RequestResponse', serializer=None, timeout=None):
+    client = _get_client(timeout)
     response = client.invoke(
         FunctionName=function_name,
-        Payload=stringify_message(payload),
+        Payload=stringify_message(payload, serializer=serializer),
         InvocationType=invocation_type,
     )
+    count_response_retries(response)
+
+    if invocation_type == 'Event':
+        return response, None
+    return response, _decode_payload(function_name, response, serializer=serializer)
+
+
+def _call_timeout(timeout=None):
+    remaining = remaining_time()
+    if remaining is not None:
+        remaining = max(remaining - DEADLINE_MARGIN, 0)
+        timeout = remaining if timeout is None else min(timeout, remaining)
+    return timeout
+
+
+@instrument('lambda')
+def call_lambdas(calls, invocation_type='RequestResponse', max_workers=None, timeout=None, serializer=None):
+    from concurrent.futures import ThreadPoolExecutor, TimeoutError
+    from botocore.exceptions import ConnectTimeoutError, ReadTimeoutError
+
+    calls = list(calls)
+    count_items(len(calls))
+    if not calls:
+        return []
+
+    timeout = _call_timeout(timeout)
+
+    def invoke(function_call):
+        function_name, payload = function_call
+        try:
+            return call_lambda(function_name,
+                               payload,
+                               invocation_type=invocation_type,
+                               serializer=serializer,
+                               timeout=timeout)
+        except (ConnectTimeoutError, ReadTimeoutError) as e:
+            if timeout is None:
+                raise
+            raise TimeoutError(f'{function_name} did not respond within {timeout:.2f}s') from e
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers or MAX_WORKERS, len(calls)))
+    try:
+        futures = [executor.submit(contextvars.copy_context().run, _capture, invoke, c) for c in calls]
+        if timeout is None:
+            return [future.result() for future in futures]
 
-    payload = parse_message(response['Payload'].read().decode('utf-8'))
-    return response, parse_message(payload['body'])
+        deadline = time.monotonic() + timeout
+        results = []
+        for (function_name, _), future in zip(calls, futures):
+            try:
+                results.append(future.result(timeout=max(deadline - time.monotonic(), 0)))
+            except TimeoutError:
+                results.append((None, TimeoutError(f'{function_name} did not respond within {timeout:.2f}s')))
+        return results
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
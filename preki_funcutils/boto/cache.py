@@ -0,0 +1,129 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+MAX_SIZE = int(os.environ.get('PREKI_DYNAMODB_CACHE_SIZE', '1024'))
+DEFAULT_TTL = float(os.environ.get('PREKI_DYNAMODB_CACHE_TTL', '60'))
+
+
+def _freeze(key):
+    return tuple(sorted(key.items()))
+
+
+class ItemCache:
+
+    def __init__(self, max_size=MAX_SIZE):
+        self.max_size = max_size
+        self.ttls = {}
+        self.key_fields = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def enabled(self, table_name):
+        return table_name in self.ttls
+
+    def get(self, table_name, key):
+        cache_key = (table_name, _freeze(key))
+        with self._lock:
+            entry = self._items.get(cache_key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return False, None
+
+            self._items.move_to_end(cache_key)
+            self.hits += 1
+
+        return True, copy.deepcopy(entry[1])
+
+    def set(self, table_name, key, item):
+        cache_key = (table_name, _freeze(key))
+        with self._lock:
+            self.key_fields.setdefault(table_name, tuple(sorted(key)))
+            self._items[cache_key] = (time.monotonic() + self.ttls[table_name], copy.deepcopy(item))
+            self._items.move_to_end(cache_key)
+
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def set_many(self, table_name, keys, items):
+        if not keys:
+            return
+
+        fields = tuple(sorted(keys[0]))
+        found = {_freeze({f: item[f] for f in fields}): item for item in items if all(f in item for f in fields)}
+        for key in keys:
+            self.set(table_name, key, found.get(_freeze(key)))
+
+    def key_of(self, table_name, item):
+        fields = self.key_fields.get(table_name)
+        if fields is None or not all(f in item for f in fields):
+            return None
+        return {f: item[f] for f in fields}
+
+    def invalidate(self, table_name, key=None):
+        with self._lock:
+            if key is not None:
+                self._items.pop((table_name, _freeze(key)), None)
+                return
+
+            for cache_key in [k for k in self._items if k[0] == table_name]:
+                del self._items[cache_key]
+
+    def invalidate_items(self, table_name, items):
+        if table_name not in self.key_fields:
+            return
+
+        for item in items:
+            key = self.key_of(table_name, item)
+            if key is None:
+                self.invalidate(table_name)
+                return
+            self.invalidate(table_name, key)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._items),
+            }
+
+
+item_cache = ItemCache()
+
+
+def enable(table_name, ttl=DEFAULT_TTL):
+    item_cache.ttls[table_name] = ttl
+
+
+def disable(table_name):
+    item_cache.ttls.pop(table_name, None)
+    item_cache.invalidate(table_name)
+
+
+def stats():
+    return item_cache.stats()
+
+
+def clear():
+    item_cache.clear()
+
+
+def _enable_from_env():
+    for table in filter(None, os.environ.get('PREKI_DYNAMODB_CACHE_TABLES', '').split(',')):
+        table_name, _, ttl = table.strip().partition(':')
+        enable(table_name, float(ttl) if ttl else DEFAULT_TTL)
+
+
+_enable_from_env()
@@ -0,0 +1,98 @@
+import os
+import threading
+
+_lock = threading.RLock()
+_session = None
+_clients = {}
+_resources = {}
+
+_config = {
+    'max_pool_connections': int(os.environ.get('PREKI_BOTO_MAX_POOL_CONNECTIONS', '50')),
+}
+
+if os.environ.get('PREKI_BOTO_CONNECT_TIMEOUT'):
+    _config['connect_timeout'] = float(os.environ['PREKI_BOTO_CONNECT_TIMEOUT'])
+
+if os.environ.get('PREKI_BOTO_READ_TIMEOUT'):
+    _config['read_timeout'] = float(os.environ['PREKI_BOTO_READ_TIMEOUT'])
+
+if os.environ.get('PREKI_BOTO_MAX_ATTEMPTS'):
+    _config.setdefault('retries', {})['max_attempts'] = int(os.environ['PREKI_BOTO_MAX_ATTEMPTS'])
+
+if os.environ.get('PREKI_BOTO_RETRY_MODE'):
+    _config.setdefault('retries', {})['mode'] = os.environ['PREKI_BOTO_RETRY_MODE']
+
+if os.environ.get('PREKI_BOTO_TCP_KEEPALIVE'):
+    _config['tcp_keepalive'] = os.environ['PREKI_BOTO_TCP_KEEPALIVE'].lower() in ('1', 'true', 'yes')
+
+
+def configure(**config):
+    with _lock:
+        _config.update(config)
+        _clients.clear()
+        _resources.clear()
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _key(service_name, kwargs, config=None):
+    return (service_name, _freeze(kwargs), _freeze(config or {}))
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        import boto3.session
+        _session = boto3.session.Session()
+    return _session
+
+
+def _get_config(config=None):
+    from botocore.config import Config
+    return Config(**{**_config, **(config or {})})
+
+
+def get_client(service_name, config=None, **kwargs):
+    key = _key(service_name, kwargs, config)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _get_session().client(service_name, config=_get_config(config), **kwargs)
+                _clients[key] = client
+    return client
+
+
+def get_resource(service_name, **kwargs):
+    key = _key(service_name, kwargs)
+    resource = _resources.get(key)
+    if resource is None:
+        with _lock:
+            resource = _resources.get(key)
+            if resource is None:
+                resource = _get_session().resource(service_name, config=_get_config(), **kwargs)
+                _resources[key] = resource
+    return resource
+
+
+def set_client(service_name, client, config=None, **kwargs):
+    with _lock:
+        _clients[_key(service_name, kwargs, config)] = client
+
+
+def set_resource(service_name, resource, **kwargs):
+    with _lock:
+        _resources[_key(service_name, kwargs)] = resource
+
+
+def reset():
+    global _session
+    with _lock:
+        _clients.clear()
+        _resources.clear()
+        _session = None
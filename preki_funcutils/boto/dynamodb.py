@@ -1,7 +1,13 @@
-import boto3
 from enum import Enum
 from typing import Union
-from ..utils import Parser, chunks
+from ..utils import Parser, chunks, run_concurrently
+from ..exceptions import BatchOperationException
+from ..internals import WriteBehind
+from ..metrics import call, count_items, count_response_retries, instrument
+from .cache import item_cache
+from .connections import get_resource
+from .expressions import expand, project, projection
+from .retry import retry_unprocessed
 
 
 class CommonReturnValue(Enum):
@@ -31,56 +37,116 @@ PutReturnValueType = Union[PutReturnValue, DeleteReturnValue, CommonReturnValue]
 UpdateReturnValueType = Union[UpdateReturnValue, DeleteReturnValue, CommonReturnValue]
 
 
-def get_item(table_name, Key, **kwargs):
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(table_name)
-    return Parser.to_number(table.get_item(Key=Key, **kwargs).get('Item', None))
+def _get_client():
+    return get_resource('dynamodb').meta.client
 
 
-def batch_get_item(table_name, Keys, **kwargs):
+def _flush_pending(table_name):
+    buffer = WriteBehind.get()
+    if buffer is not None:
+        buffer.flush_items(table_name)
+
+
+@instrument('dynamodb')
+def get_item(table_name, Key, fields=None, **kwargs):
+    cached = not kwargs and item_cache.enabled(table_name)
+    if cached:
+        hit, item = item_cache.get(table_name, Key)
+        if hit:
+            return project(item, fields) if fields else item
+
+    _flush_pending(table_name)
+    client = _get_client()
+    response = client.get_item(TableName=table_name, Key=Key, **projection(fields, kwargs))
+    count_response_retries(response)
+    item = Parser.to_number(response.get('Item', None))
+
+    if cached and not fields:
+        item_cache.set(table_name, Key, item)
+    return item
+
+
+def _dispatch_chunks(operation, table_name, func, chunked, max_workers=None):
+    items, unprocessed, errors = [], [], []
+    for i, (result, error) in enumerate(run_concurrently(func, chunked, max_workers=max_workers)):
+        if error is not None:
+            errors.append((i, error))
+            continue
+
+        items += Parser.to_number(result.responses.get(table_name, []))
+        if result.unprocessed:
+            unprocessed.append(result.unprocessed)
+
+    if errors or unprocessed:
+        raise BatchOperationException(
+            f'{operation} failed for {len(errors)} chunk(s) and left {len(unprocessed)} chunk(s) unprocessed',
+            results=items,
+            errors=errors,
+            unprocessed=unprocessed,
+        )
+
+    return items
+
+
+@instrument('dynamodb')
+def batch_get_item(table_name, Keys, max_workers=None, fields=None, **kwargs):
     if not table_name:
         raise Exception('Table name cannot be empty')
-    dynamodb = boto3.resource('dynamodb')
 
-    items = []
-    for c in chunks(Keys, 100):
-        items += _batch_get_item(dynamodb=dynamodb,
-                                 RequestItems={
-                                     table_name: {
-                                         'Keys': c,
-                                         'ConsistentRead': False
-                                     }
-                                 },
-                                 **kwargs).get(table_name, [])
+    cached, hits = not kwargs and item_cache.enabled(table_name), []
+    if cached:
+        misses = []
+        for key in Keys:
+            hit, item = item_cache.get(table_name, key)
+            if not hit:
+                misses.append(key)
+            elif item is not None:
+                hits.append(project(item, fields) if fields else item)
+
+        Keys = misses
+        if not Keys:
+            return hits
+
+    _flush_pending(table_name)
+    client = _get_client()
+    request = projection(fields, {'ConsistentRead': False})
+
+    def get_chunk(c):
+        return _batch_get_item(client=client, RequestItems={table_name: {'Keys': c, **request}}, **kwargs)
 
-    return Parser.to_number(items)
+    try:
+        items = _dispatch_chunks('batch_get_item', table_name, get_chunk, chunks(Keys, 100), max_workers=max_workers)
+    except BatchOperationException as e:
+        e.results = hits + e.results
+        raise e
 
+    if cached and not fields:
+        item_cache.set_many(table_name, Keys, items)
+    return hits + items
 
-def _batch_get_item(dynamodb, RequestItems, **kwargs):
-    response = dynamodb.batch_get_item(
-        RequestItems=RequestItems,
-        **kwargs,
-    )
-    responses, unprocessed_keys = response.get('Responses', {}), response.get('UnprocessedKeys', {})
 
-    if unprocessed_keys:
-        unprocessed_responses = _batch_get_item(dynamodb=dynamodb, RequestItems=unprocessed_keys, **kwargs)
-        for table, values in (unprocessed_responses or {}).items():
-            if table in responses:
-                responses[table] += values
-                continue
-            responses[table] = values
+def _batch_get_item(client, RequestItems, **kwargs):
 
-    return responses
+    def call(request):
+        response = client.batch_get_item(
+            RequestItems=request,
+            **kwargs,
+        )
+        count_response_retries(response)
+        return response.get('Responses', {}), response.get('UnprocessedKeys', {})
+
+    return retry_unprocessed(call, RequestItems)
 
 
-def batch_write_item(table_name, PutItems=[], DeleteKeys=[], **kwargs):
+@instrument('dynamodb')
+def batch_write_item(table_name, PutItems=[], DeleteKeys=[], max_workers=None, ordered=False, **kwargs):
     if not table_name:
         raise Exception('Table name cannot be empty')
     if not PutItems and not DeleteKeys:
         raise Exception('Requests cannot be empty')
 
-    dynamodb = boto3.resource('dynamodb')
+    _flush_pending(table_name)
+    client = _get_client()
 
     requests = [
         *[{
@@ -95,32 +161,59 @@ def batch_write_item(table_name, PutItems=[], DeleteKeys=[], **kwargs):
         } for key in DeleteKeys],
     ]
 
-    for c in chunks(requests, 25):
-        _batch_write_item(dynamodb=dynamodb, RequestItems={table_name: c}, **kwargs)
+    count_items(len(requests))
+
+    def write_chunk(c):
+        return _batch_write_item(client=client, RequestItems={table_name: c}, **kwargs)
+
+    try:
+        _dispatch_chunks('batch_write_item',
+                         table_name,
+                         write_chunk,
+                         chunks(requests, 25),
+                         max_workers=1 if ordered else max_workers)
+    finally:
+        item_cache.invalidate_items(table_name, [*PutItems, *DeleteKeys])
 
 
-def _batch_write_item(dynamodb, RequestItems, **kwargs):
-    response = dynamodb.batch_write_item(
-        RequestItems=RequestItems,
-        **kwargs,
-    )
-    unprocessed_keys = response.get('UnprocessedKeys', {})
+def _batch_write_item(client, RequestItems, **kwargs):
 
-    if unprocessed_keys:
-        _batch_write_item(dynamodb=dynamodb, RequestItems=unprocessed_keys, **kwargs)
+    def call(request):
+        response = client.batch_write_item(
+            RequestItems=request,
+            **kwargs,
+        )
+        count_response_retries(response)
+        return None, response.get('UnprocessedItems', {})
+
+    return retry_unprocessed(call, RequestItems)
 
 
 def put_item(table_name, Item, ReturnValues: PutReturnValueType = PutReturnValue.NONE, **kwargs):
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(table_name)
+    buffer = WriteBehind.get()
+    if buffer is not None and ReturnValues.value == 'NONE' and not kwargs:
+        return buffer.put_item(table_name, Parser.to_decimal(Item))
+
+    return _put_item(table_name, Item, ReturnValues=ReturnValues, **kwargs)
+
+
+@instrument('dynamodb', 'put_item', items=1)
+def _put_item(table_name, Item, ReturnValues: PutReturnValueType = PutReturnValue.NONE, **kwargs):
+    _flush_pending(table_name)
+    client = _get_client()
     Item = Parser.to_decimal(Item)
 
-    response = table.put_item(Item=Item, ReturnValues=ReturnValues.value, **kwargs)
+    try:
+        response = client.put_item(TableName=table_name, Item=Item, ReturnValues=ReturnValues.value, **expand(kwargs))
+        count_response_retries(response)
+    finally:
+        item_cache.invalidate_items(table_name, [Item])
 
     if ReturnValues == DeleteReturnValue.ALL_OLD:
         return Parser.to_number(response.get('Attributes', None))
 
 
+@instrument('dynamodb', items=1)
 def update_item(table_name,
                 Key,
                 UpdateExpression,
@@ -132,37 +225,44 @@ def update_item(table_name,
     else:
         ExpressionAttributeValues = {}
 
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(table_name)
+    _flush_pending(table_name)
+    client = _get_client()
 
-    response = Parser.to_number(
-        table.update_item(
-            Key=Key,
-            UpdateExpression=UpdateExpression,
-            ReturnValues=ReturnValues.value,
-            **ExpressionAttributeValues,
-            **kwargs,
-        ))
+    kwargs = expand({'UpdateExpression': UpdateExpression, **ExpressionAttributeValues, **kwargs})
+
+    try:
+        response = client.update_item(TableName=table_name, Key=Key, ReturnValues=ReturnValues.value, **kwargs)
+        count_response_retries(response)
+    finally:
+        item_cache.invalidate_items(table_name, [Key])
 
     if ReturnValues != UpdateReturnValue.NONE:
         return Parser.to_number(response.get('Attributes', None))
 
 
+@instrument('dynamodb', items=1)
 def delete_item(table_name, Key, ReturnValues: DeleteReturnValueType = DeleteReturnValue.NONE, **kwargs):
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(table_name)
+    _flush_pending(table_name)
+    client = _get_client()
 
-    response = table.delete_item(Key=Key, ReturnValues=ReturnValues.value, **kwargs)
+    try:
+        response = client.delete_item(TableName=table_name, Key=Key, ReturnValues=ReturnValues.value, **expand(kwargs))
+        count_response_retries(response)
+    finally:
+        item_cache.invalidate_items(table_name, [Key])
 
     if ReturnValues == DeleteReturnValue.ALL_OLD:
         return Parser.to_number(response.get('Attributes', None))
 
 
-def query(table_name, KeyConditionExpression, **kwargs):
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(table_name)
+@instrument('dynamodb')
+def query(table_name, KeyConditionExpression, fields=None, **kwargs):
+    _flush_pending(table_name)
+    client = _get_client()
 
-    response = table.query(KeyConditionExpression=KeyConditionExpression, **kwargs)
+    kwargs = expand(projection(fields, {'KeyConditionExpression': KeyConditionExpression, **kwargs}))
+    response = client.query(TableName=table_name, **kwargs)
+    count_response_retries(response)
 
     return Parser.to_number(response.get('Items', None)), {
         'Count': response.get('Count', None),
@@ -171,31 +271,57 @@ def query(table_name, KeyConditionExpression, **kwargs):
     }
 
 
-def query_all(table_name, KeyConditionExpression, **kwargs):
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(table_name)
+def query_all(table_name, KeyConditionExpression, fields=None, **kwargs):
+    return list(
+        iter_query(table_name=table_name, KeyConditionExpression=KeyConditionExpression, fields=fields, **kwargs))
 
-    return _query_all(table=table, KeyConditionExpression=KeyConditionExpression, **kwargs)
 
+def iter_query(table_name, KeyConditionExpression, max_items=None, page_size=None, pages=False, fields=None, **kwargs):
+    _flush_pending(table_name)
+    client = _get_client()
 
-def _query_all(table, KeyConditionExpression, **kwargs):
-    response = table.query(KeyConditionExpression=KeyConditionExpression, **kwargs)
+    kwargs = expand(projection(fields, {'KeyConditionExpression': KeyConditionExpression, **kwargs}))
+    yield from _iter_pages(client.query,
+                           'query',
+                           max_items=max_items,
+                           page_size=page_size,
+                           pages=pages,
+                           TableName=table_name,
+                           **kwargs)
 
-    items, last_key = Parser.to_number(response.get('Items', None)), response.get('LastEvaluatedKey', None)
-    if items and last_key:
-        items += _query_all(
-            table=table,
-            KeyConditionExpression=KeyConditionExpression,
-            **kwargs,
-            ExclusiveStartKey=last_key,
-        )
 
-    return items
+def _iter_pages(operation, operation_name, max_items=None, page_size=None, pages=False, **kwargs):
+    if page_size:
+        kwargs['Limit'] = page_size
 
+    count = 0
+    while max_items is None or count < max_items:
+        with call('dynamodb', operation_name):
+            response = operation(**kwargs)
+            count_items(len(response.get('Items', [])))
+            count_response_retries(response)
 
-def scan(table_name, ExclusiveStartKey=None, ExpressionAttributeValues=None, **kwargs):
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(table_name)
+        items = Parser.to_number(response.get('Items', []))
+        if max_items is not None:
+            items = items[:max_items - count]
+        count += len(items)
+
+        if pages:
+            if items:
+                yield items
+        else:
+            yield from items
+
+        last_key = response.get('LastEvaluatedKey', None)
+        if not last_key:
+            return
+        kwargs['ExclusiveStartKey'] = last_key
+
+
+@instrument('dynamodb')
+def scan(table_name, ExclusiveStartKey=None, ExpressionAttributeValues=None, fields=None, **kwargs):
+    _flush_pending(table_name)
+    client = _get_client()
 
     if ExclusiveStartKey:
         ExclusiveStartKey = {'ExclusiveStartKey': Parser.to_decimal(ExclusiveStartKey)}
@@ -207,10 +333,39 @@ def scan(table_name, ExclusiveStartKey=None, ExpressionAttributeValues=None, **k
     else:
         ExpressionAttributeValues = {}
 
-    response = table.scan(**ExclusiveStartKey, **ExpressionAttributeValues, **kwargs)
+    kwargs = expand(projection(fields, {**ExclusiveStartKey, **ExpressionAttributeValues, **kwargs}))
+    response = client.scan(TableName=table_name, **kwargs)
+    count_response_retries(response)
 
     return Parser.to_number(response.get('Items', None)), {
         'Count': response.get('Count', None),
         'ScannedCount': response.get('ScannedCount', None),
         'LastEvaluatedKey': response.get('LastEvaluatedKey', None),
     }
+
+
+def iter_scan(table_name,
+              ExclusiveStartKey=None,
+              ExpressionAttributeValues=None,
+              max_items=None,
+              page_size=None,
+              pages=False,
+              fields=None,
+              **kwargs):
+    _flush_pending(table_name)
+    client = _get_client()
+
+    if ExclusiveStartKey:
+        kwargs['ExclusiveStartKey'] = Parser.to_decimal(ExclusiveStartKey)
+
+    if ExpressionAttributeValues:
+        kwargs['ExpressionAttributeValues'] = Parser.to_decimal(ExpressionAttributeValues)
+
+    kwargs = expand(projection(fields, kwargs))
+    yield from _iter_pages(client.scan,
+                           'scan',
+                           max_items=max_items,
+                           page_size=page_size,
+                           pages=pages,
+                           TableName=table_name,
+                           **kwargs)
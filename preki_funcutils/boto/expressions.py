@@ -0,0 +1,281 @@
+import os
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from ..utils import Parser
+
+CACHE_SIZE = int(os.environ.get('PREKI_EXPRESSION_CACHE_SIZE', '512'))
+
+PREFIXES = {
+    'UpdateExpression': 'u',
+    'KeyConditionExpression': 'k',
+    'FilterExpression': 'f',
+    'ConditionExpression': 'c',
+}
+
+
+def _alias_path(path, names, prefix):
+    aliased = []
+    for part in path.split('.'):
+        name, bracket, index = part.partition('[')
+        if name not in names:
+            names[name] = f'#{prefix}{len(names)}'
+        aliased.append(names[name] + bracket + index)
+    return '.'.join(aliased)
+
+
+class Expression(ABC):
+
+    @abstractmethod
+    def shape(self):
+        pass
+
+    @abstractmethod
+    def values(self):
+        pass
+
+    def compile(self, prefix):
+        expression, names = _compile(self.shape(), prefix)
+        values = Parser.to_decimal(self.values())
+        return expression, dict(names), {f':{prefix}{i}': v for i, v in enumerate(values)}
+
+
+class Condition(Expression):
+
+    def __init__(self, shape, values):
+        self._shape = shape
+        self._values = values
+
+    def shape(self):
+        return self._shape
+
+    def values(self):
+        return self._values
+
+    def __and__(self, other):
+        return Condition(('AND', self._shape, other._shape), self._values + other._values)
+
+    def __or__(self, other):
+        return Condition(('OR', self._shape, other._shape), self._values + other._values)
+
+    def __invert__(self):
+        return Condition(('NOT', self._shape), self._values)
+
+
+class Attr:
+
+    def __init__(self, path):
+        self.path = path
+
+    def _compare(self, operator, value):
+        return Condition(('compare', operator, self.path), [value])
+
+    def eq(self, value):
+        return self._compare('=', value)
+
+    def ne(self, value):
+        return self._compare('<>', value)
+
+    def lt(self, value):
+        return self._compare('<', value)
+
+    def lte(self, value):
+        return self._compare('<=', value)
+
+    def gt(self, value):
+        return self._compare('>', value)
+
+    def gte(self, value):
+        return self._compare('>=', value)
+
+    def between(self, low, high):
+        return Condition(('between', self.path), [low, high])
+
+    def begins_with(self, value):
+        return Condition(('function', 'begins_with', self.path), [value])
+
+    def contains(self, value):
+        return Condition(('function', 'contains', self.path), [value])
+
+    def is_in(self, values):
+        return Condition(('in', self.path, len(values)), list(values))
+
+    def exists(self):
+        return Condition(('exists', 'attribute_exists', self.path), [])
+
+    def not_exists(self):
+        return Condition(('exists', 'attribute_not_exists', self.path), [])
+
+
+def attr(path):
+    return Attr(path)
+
+
+class Update(Expression):
+
+    def __init__(self):
+        self._actions = []
+        self._values = []
+
+    def set(self, path, value, if_not_exists=False):
+        self._actions.append(('SET', path, if_not_exists))
+        self._values.append(value)
+        return self
+
+    def add(self, path, value):
+        self._actions.append(('ADD', path, False))
+        self._values.append(value)
+        return self
+
+    def remove(self, path):
+        self._actions.append(('REMOVE', path, False))
+        return self
+
+    def delete(self, path, value):
+        self._actions.append(('DELETE', path, False))
+        self._values.append(value)
+        return self
+
+    def shape(self):
+        return ('update', tuple(self._actions))
+
+    def values(self):
+        return self._values
+
+
+def _render_condition(shape, names, prefix, counter):
+    kind = shape[0]
+    if kind in ('AND', 'OR'):
+        left = _render_condition(shape[1], names, prefix, counter)
+        right = _render_condition(shape[2], names, prefix, counter)
+        return f'({left} {kind} {right})'
+    if kind == 'NOT':
+        return f'(NOT {_render_condition(shape[1], names, prefix, counter)})'
+
+    def value():
+        counter[0] += 1
+        return f':{prefix}{counter[0] - 1}'
+
+    if kind == 'compare':
+        return f'{_alias_path(shape[2], names, prefix)} {shape[1]} {value()}'
+    if kind == 'between':
+        path = _alias_path(shape[1], names, prefix)
+        return f'{path} BETWEEN {value()} AND {value()}'
+    if kind == 'function':
+        return f'{shape[1]}({_alias_path(shape[2], names, prefix)}, {value()})'
+    if kind == 'in':
+        path = _alias_path(shape[1], names, prefix)
+        return f'{path} IN ({", ".join(value() for _ in range(shape[2]))})'
+    return f'{shape[1]}({_alias_path(shape[2], names, prefix)})'
+
+
+def _render_update(actions, names, prefix):
+    clauses, i = {}, 0
+    for action, path, if_not_exists in actions:
+        path = _alias_path(path, names, prefix)
+        if action == 'REMOVE':
+            clauses.setdefault(action, []).append(path)
+            continue
+
+        value = f':{prefix}{i}'
+        i += 1
+        if action == 'SET':
+            clause = f'{path} = if_not_exists({path}, {value})' if if_not_exists else f'{path} = {value}'
+        else:
+            clause = f'{path} {value}'
+        clauses.setdefault(action, []).append(clause)
+
+    return ' '.join(f'{action} {", ".join(c)}' for action, c in clauses.items())
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _compile(shape, prefix):
+    names = {}
+    if shape[0] == 'update':
+        expression = _render_update(shape[1], names, prefix)
+    else:
+        expression = _render_condition(shape, names, prefix, [0])
+    return expression, tuple((alias, name) for name, alias in names.items())
+
+
+def expand(kwargs):
+    expressions = [(arg, kwargs[arg]) for arg in PREFIXES if isinstance(kwargs.get(arg), Expression)]
+    if not expressions:
+        return kwargs
+
+    kwargs = dict(kwargs)
+    names = dict(kwargs.get('ExpressionAttributeNames') or {})
+    values = dict(kwargs.get('ExpressionAttributeValues') or {})
+    for arg, expression in expressions:
+        kwargs[arg], expression_names, expression_values = expression.compile(PREFIXES[arg])
+        names.update(expression_names)
+        values.update(expression_values)
+
+    if names:
+        kwargs['ExpressionAttributeNames'] = names
+    if values:
+        kwargs['ExpressionAttributeValues'] = values
+    return kwargs
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _compile_projection(fields):
+    names = {}
+    expression = ', '.join(_alias_path(field, names, 'p') for field in fields)
+    return expression, tuple((alias, name) for name, alias in names.items())
+
+
+def projection(fields, kwargs):
+    if not fields:
+        return kwargs
+
+    expression, names = _compile_projection(tuple(fields))
+    return {
+        **kwargs,
+        'ProjectionExpression': expression,
+        'ExpressionAttributeNames': {
+            **(kwargs.get('ExpressionAttributeNames') or {}),
+            **dict(names),
+        },
+    }
+
+
+def _parse_path(path):
+    parts = []
+    for part in path.split('.'):
+        name, _, indexes = part.partition('[')
+        parts.append(name)
+        if indexes:
+            parts += [int(i) for i in indexes.rstrip(']').split('][')]
+    return parts
+
+
+def _copy_path(source, target, parts):
+    for i, part in enumerate(parts):
+        try:
+            value = source[part]
+        except (KeyError, IndexError, TypeError):
+            return
+
+        if i == len(parts) - 1:
+            target[part] = value
+            return
+
+        source, target = value, target.setdefault(part, {})
+
+
+def _to_lists(value, source):
+    if isinstance(source, list):
+        return [_to_lists(value[i], source[i]) for i in sorted(value)]
+    if isinstance(source, dict) and isinstance(value, dict) and value is not source:
+        return {k: _to_lists(v, source[k]) for k, v in value.items()}
+    return value
+
+
+def project(item, fields):
+    if item is None:
+        return None
+
+    projected = {}
+    for field in fields:
+        _copy_path(item, projected, _parse_path(field))
+    return _to_lists(projected, item)
@@ -0,0 +1,178 @@
+import contextvars
+import inspect
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from ..utils import MAX_WORKERS, Parser
+from .dynamodb import scan
+from .expressions import expand, projection
+from .retry import remaining_time
+
+DEADLINE_MARGIN = float(os.environ.get('PREKI_SCAN_DEADLINE_MARGIN', '10'))
+BUFFERED_PAGES = int(os.environ.get('PREKI_SCAN_BUFFERED_PAGES', '4'))
+
+
+def _dump_key(key):
+    if not key:
+        return key
+
+    from boto3.dynamodb.types import TypeSerializer
+    serializer = TypeSerializer()
+    return {k: serializer.serialize(v) for k, v in key.items()}
+
+
+def _load_key(key):
+    if not key:
+        return key
+
+    from boto3.dynamodb.types import TypeDeserializer
+    deserializer = TypeDeserializer()
+    return {k: deserializer.deserialize(v) if isinstance(v, dict) else Parser.to_decimal(v) for k, v in key.items()}
+
+
+class ScanCheckpoint:
+
+    def __init__(self, total_segments, segments=None):
+        self.total_segments = total_segments
+        self.segments = segments or {i: {'LastEvaluatedKey': None, 'done': False} for i in range(total_segments)}
+
+    @property
+    def done(self):
+        return all(s['done'] for s in self.segments.values())
+
+    def pending(self):
+        return [i for i, s in sorted(self.segments.items()) if not s['done']]
+
+    def advance(self, segment, last_key):
+        self.segments[segment] = {'LastEvaluatedKey': last_key, 'done': not last_key}
+
+    def to_dict(self):
+        segments = [{
+            'segment': i,
+            'LastEvaluatedKey': _dump_key(s['LastEvaluatedKey']),
+            'done': s['done'],
+        } for i, s in sorted(self.segments.items())]
+        return {'total_segments': self.total_segments, 'segments': segments}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            total_segments=data['total_segments'],
+            segments={
+                s['segment']: {
+                    'LastEvaluatedKey': _load_key(s['LastEvaluatedKey']),
+                    'done': s['done']
+                }
+                for s in data['segments']
+            },
+        )
+
+
+def _put(q, message, stop):
+    while not stop.is_set():
+        try:
+            q.put(message, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _scan_segment(table_name, segment, total_segments, last_key, out, stop, kwargs):
+    try:
+        while not stop.is_set():
+            items, metadata = scan(table_name,
+                                   ExclusiveStartKey=last_key,
+                                   Segment=segment,
+                                   TotalSegments=total_segments,
+                                   **kwargs)
+            last_key = metadata['LastEvaluatedKey']
+
+            if not _put(out, ('page', segment, (items, last_key)), stop) or not last_key:
+                break
+
+            remaining = remaining_time()
+            if remaining is not None and remaining < DEADLINE_MARGIN:
+                break
+    except Exception as e:
+        _put(out, ('error', segment, e), stop)
+    finally:
+        _put(out, ('end', segment, None), stop)
+
+
+def iter_parallel_scan(table_name,
+                       total_segments=None,
+                       max_workers=None,
+                       ordered=False,
+                       checkpoint=None,
+                       pages=False,
+                       fields=None,
+                       **kwargs):
+    kwargs = expand(projection(fields, kwargs))
+    checkpoint = checkpoint or ScanCheckpoint(total_segments or MAX_WORKERS)
+    segments = checkpoint.pending()
+    if not segments:
+        return
+
+    stop = threading.Event()
+    if ordered:
+        queues = {s: queue.Queue(maxsize=BUFFERED_PAGES) for s in segments}
+        sources = [(queues[s], 1) for s in segments]
+    else:
+        shared = queue.Queue(maxsize=BUFFERED_PAGES * len(segments))
+        queues = {s: shared for s in segments}
+        sources = [(shared, len(segments))]
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers or MAX_WORKERS, len(segments)))
+    try:
+        for s in segments:
+            executor.submit(
+                contextvars.copy_context().run,
+                _scan_segment,
+                table_name,
+                s,
+                checkpoint.total_segments,
+                checkpoint.segments[s]['LastEvaluatedKey'],
+                queues[s],
+                stop,
+                kwargs,
+            )
+
+        for source, running in sources:
+            while running:
+                kind, segment, payload = source.get()
+                if kind == 'error':
+                    raise payload
+                if kind == 'end':
+                    running -= 1
+                    continue
+
+                items, last_key = payload
+                if pages:
+                    if items:
+                        yield items
+                else:
+                    yield from items
+                checkpoint.advance(segment, last_key)
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+
+
+def parallel_scan(table_name, consumer, checkpoint=None, total_segments=None, **kwargs):
+    kwargs = expand(kwargs)
+    checkpoint = checkpoint or ScanCheckpoint(total_segments or MAX_WORKERS)
+
+    if inspect.isgenerator(consumer):
+        next(consumer)
+        try:
+            for item in iter_parallel_scan(table_name, checkpoint=checkpoint, **kwargs):
+                consumer.send(item)
+        finally:
+            consumer.close()
+    else:
+        for item in iter_parallel_scan(table_name, checkpoint=checkpoint, **kwargs):
+            consumer(item)
+
+    return checkpoint
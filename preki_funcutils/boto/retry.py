@@ -0,0 +1,100 @@
+import os
+import random
+import threading
+import time
+from ..internals import LambdaDeadline
+from ..metrics import count_retries
+
+_policy = {
+    'max_attempts': int(os.environ.get('PREKI_RETRY_MAX_ATTEMPTS', '8')),
+    'base_delay': float(os.environ.get('PREKI_RETRY_BASE_DELAY', '0.05')),
+    'max_delay': float(os.environ.get('PREKI_RETRY_MAX_DELAY', '5')),
+    'deadline_margin': float(os.environ.get('PREKI_RETRY_DEADLINE_MARGIN', '1')),
+}
+
+_metrics_lock = threading.Lock()
+_metrics = {'calls': 0, 'retries': 0, 'sleep_time': 0.0, 'exhausted': 0}
+
+
+class RetryResult:
+
+    def __init__(self):
+        self.responses = {}
+        self.unprocessed = {}
+        self.attempts = 0
+        self.sleep_time = 0.0
+
+    @property
+    def retries(self):
+        return max(self.attempts - 1, 0)
+
+    @property
+    def succeeded(self):
+        return not self.unprocessed
+
+
+def configure(**policy):
+    _policy.update(policy)
+
+
+def get_metrics():
+    with _metrics_lock:
+        return dict(_metrics)
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.update({'calls': 0, 'retries': 0, 'sleep_time': 0.0, 'exhausted': 0})
+
+
+def remaining_time(deadline=None):
+    deadline = deadline if deadline is not None else LambdaDeadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def backoff_delay(attempt, base_delay=None, max_delay=None):
+    base_delay = _policy['base_delay'] if base_delay is None else base_delay
+    max_delay = _policy['max_delay'] if max_delay is None else max_delay
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))
+
+
+def _merge_responses(responses, new_responses):
+    for table, values in (new_responses or {}).items():
+        if table in responses:
+            responses[table] += values
+            continue
+        responses[table] = values
+
+
+def retry_unprocessed(call, request, max_attempts=None, deadline=None):
+    max_attempts = max_attempts or _policy['max_attempts']
+    result = RetryResult()
+
+    while request:
+        responses, request = call(request)
+        result.attempts += 1
+        _merge_responses(result.responses, responses)
+
+        if not request or result.attempts >= max_attempts:
+            break
+
+        delay = backoff_delay(result.attempts - 1)
+        remaining = remaining_time(deadline)
+        if remaining is not None and remaining - _policy['deadline_margin'] < delay:
+            break
+
+        time.sleep(delay)
+        result.sleep_time += delay
+
+    result.unprocessed = request or {}
+    count_retries(result.retries)
+
+    with _metrics_lock:
+        _metrics['calls'] += 1
+        _metrics['retries'] += result.retries
+        _metrics['sleep_time'] += result.sleep_time
+        _metrics['exhausted'] += 0 if result.succeeded else 1
+
+    return result
@@ -1,11 +1,77 @@
-import boto3
-from ..utils import stringify_message
+from ..utils import chunks, run_concurrently, stringify_message
+from ..metrics import count_items, count_response_retries, instrument
+from .connections import get_client
 
 
+@instrument('sns', items=1)
 def send_topic_message(topic_arn, message, **kwargs):
-    sns = boto3.client('sns')
-    return sns.publish(
+    sns = get_client('sns')
+    response = sns.publish(
         TargetArn=topic_arn,
         Message=stringify_message(message),
         **kwargs,
     )
+    count_response_retries(response)
+    return response
+
+
+def _failure(entry_id, error):
+    return {'Id': entry_id, 'Code': type(error).__name__, 'Message': str(error), 'SenderFault': False}
+
+
+def _publish_entries(sns, topic_arn, entries):
+    if hasattr(sns, 'publish_batch'):
+        response = sns.publish_batch(TopicArn=topic_arn, PublishBatchRequestEntries=entries)
+        count_response_retries(response)
+        return response.get('Successful', []), response.get('Failed', [])
+
+    successful, failed = [], []
+    for entry in entries:
+        try:
+            response = sns.publish(TopicArn=topic_arn, **{k: v for k, v in entry.items() if k != 'Id'})
+            count_response_retries(response)
+            successful.append({'Id': entry['Id'], 'MessageId': response['MessageId']})
+        except Exception as e:
+            failed.append(_failure(entry['Id'], e))
+
+    return successful, failed
+
+
+@instrument('sns')
+def send_topic_messages_batch(topic_arn, messages, deduplication_ids=None, group_ids=None, max_workers=None, **kwargs):
+    count_items(len(messages))
+    sns = get_client('sns')
+
+    entries = [{
+        'Id': f'{i}',
+        'Message': stringify_message(m),
+        **kwargs,
+    } for i, m in enumerate(messages)]
+
+    for field, values in (('MessageDeduplicationId', deduplication_ids), ('MessageGroupId', group_ids)):
+        if values is None:
+            continue
+        if len(values) != len(messages):
+            raise Exception(f'Expected {len(messages)} {field} values, got {len(values)}')
+        for entry, value in zip(entries, values):
+            entry[field] = value
+
+    entries_chunks = list(chunks(entries, 10))
+    if topic_arn.endswith('.fifo'):
+        max_workers = 1
+
+    response = {
+        'Successful': [],
+        'Failed': [],
+    }
+
+    results = run_concurrently(lambda c: _publish_entries(sns, topic_arn, c), entries_chunks, max_workers=max_workers)
+    for entries_chunk, (result, error) in zip(entries_chunks, results):
+        if error is not None:
+            response['Failed'].extend(_failure(entry['Id'], error) for entry in entries_chunk)
+            continue
+
+        response['Successful'].extend(result[0])
+        response['Failed'].extend(result[1])
+
+    return response
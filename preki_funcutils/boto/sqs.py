@@ -1,33 +1,103 @@
-import boto3
+import os
+import threading
+import time
+from contextlib import contextmanager
 from ..utils import chunks, stringify_message
+from ..internals import WriteBehind
+from ..metrics import call, count_items, count_response_retries, instrument
+from .connections import get_resource
 
+QUEUE_URL_TTL = float(os.environ.get('PREKI_SQS_QUEUE_URL_TTL', '3600'))
+QUEUE_DOES_NOT_EXIST_CODES = ('AWS.SimpleQueueService.NonExistentQueue', 'QueueDoesNotExist')
 
-def enqueue_message(queue_name, message, **kwargs):
-    sqs = boto3.resource('sqs')
-    queue = sqs.get_queue_by_name(QueueName=queue_name)
-    return queue.send_message(
-        MessageBody=stringify_message(message),
-        **kwargs,
-    )
+_queue_urls = {}
+_queue_urls_lock = threading.Lock()
 
 
-def enqueue_messages_batch(queue_name, messages, **kwargs):
-    sqs = boto3.resource('sqs')
-    queue = sqs.get_queue_by_name(QueueName=queue_name)
+def _get_client():
+    return get_resource('sqs').meta.client
 
+
+def get_queue_url(queue_name):
+    cached = _queue_urls.get(queue_name)
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+
+    with call('sqs', 'get_queue_url'):
+        response = _get_client().get_queue_url(QueueName=queue_name)
+        count_response_retries(response)
+        queue_url = response['QueueUrl']
+    with _queue_urls_lock:
+        _queue_urls[queue_name] = (queue_url, time.monotonic() + QUEUE_URL_TTL)
+
+    return queue_url
+
+
+def invalidate_queue_url(queue_name=None):
+    with _queue_urls_lock:
+        if queue_name is None:
+            _queue_urls.clear()
+        else:
+            _queue_urls.pop(queue_name, None)
+
+
+@contextmanager
+def _invalidate_missing_queue(queue_name):
+    try:
+        yield
+    except Exception as e:
+        code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+        if queue_name and code in QUEUE_DOES_NOT_EXIST_CODES:
+            invalidate_queue_url(queue_name)
+        raise
+
+
+def enqueue_message(queue_name, message, queue_url=None, **kwargs):
+    buffer = WriteBehind.get()
+    if buffer is not None:
+        return buffer.enqueue_message(queue_name, message, queue_url=queue_url, **kwargs)
+
+    return _enqueue_message(queue_name, message, queue_url=queue_url, **kwargs)
+
+
+@instrument('sqs', 'enqueue_message', items=1)
+def _enqueue_message(queue_name, message, queue_url=None, **kwargs):
+    with _invalidate_missing_queue(queue_name):
+        response = _get_client().send_message(
+            QueueUrl=queue_url or get_queue_url(queue_name),
+            MessageBody=stringify_message(message),
+            **kwargs,
+        )
+        count_response_retries(response)
+        return response
+
+
+def enqueue_messages_batch(queue_name, messages, queue_url=None, **kwargs):
+    return _send_message_entries(queue_name, [(m, kwargs) for m in messages], queue_url=queue_url)
+
+
+@instrument('sqs', 'enqueue_messages_batch')
+def _send_message_entries(queue_name, entries, queue_url=None):
+    count_items(len(entries))
     response = {
         'Successful': [],
         'Failed': [],
     }
 
-    for messages_chunk in chunks(messages, 10):
-        chunk_response = queue.send_messages(Entries=[{
-            'Id': f'{i}',
-            'MessageBody': stringify_message(m),
-            **kwargs,
-        } for i, m in enumerate(messages_chunk)])
+    with _invalidate_missing_queue(queue_name):
+        client = _get_client()
+        queue_url = queue_url or get_queue_url(queue_name)
+
+        for start, entries_chunk in enumerate(chunks(entries, 10)):
+            chunk_entries = [{
+                'Id': f'{start * 10 + i}',
+                'MessageBody': stringify_message(m),
+                **kwargs,
+            } for i, (m, kwargs) in enumerate(entries_chunk)]
+            chunk_response = client.send_message_batch(QueueUrl=queue_url, Entries=chunk_entries)
+            count_response_retries(chunk_response)
 
-        response['Successful'].extend(chunk_response.get('Successful', []))
-        response['Failed'].extend(chunk_response.get('Failed', []))
+            response['Successful'].extend(chunk_response.get('Successful', []))
+            response['Failed'].extend(chunk_response.get('Failed', []))
 
     return response
@@ -0,0 +1,115 @@
+import threading
+from contextlib import contextmanager
+from ..exceptions import BatchOperationException
+from ..internals import WriteBehind
+from ..logger import LogLevel, log
+from ..metrics import call, phase
+from .cache import item_cache
+from .connections import get_resource
+from . import dynamodb, sqs
+
+_key_fields = {}
+
+
+# Deduplicating 2+ buffered items reads the key schema, which needs dynamodb:DescribeTable
+def _get_key_fields(table_name):
+    fields = item_cache.key_fields.get(table_name) or _key_fields.get(table_name)
+    if fields is None:
+        client = get_resource('dynamodb').meta.client
+        with call('dynamodb', 'describe_table'):
+            response = client.describe_table(TableName=table_name)
+        fields = tuple(sorted(k['AttributeName'] for k in response['Table']['KeySchema']))
+        _key_fields[table_name] = fields
+    return fields
+
+
+def _dedupe(table_name, items):
+    if len(items) < 2:
+        return items
+
+    fields = _get_key_fields(table_name)
+    deduped = {}
+    for item in items:
+        key = tuple(item.get(f) for f in fields)
+        deduped.pop(key, None)
+        deduped[key] = item
+    return list(deduped.values())
+
+
+class WriteBehindBuffer:
+
+    def __init__(self):
+        self.items = {}
+        self.messages = {}
+        self._lock = threading.Lock()
+
+    def put_item(self, table_name, Item):
+        with self._lock:
+            self.items.setdefault(table_name, []).append(Item)
+        item_cache.invalidate_items(table_name, [Item])
+
+    def flush_items(self, table_name):
+        with self._lock:
+            table_items = self.items.pop(table_name, None)
+
+        if table_items:
+            dynamodb.batch_write_item(table_name, PutItems=_dedupe(table_name, table_items))
+
+    def enqueue_message(self, queue_name, message, queue_url=None, **kwargs):
+        with self._lock:
+            self.messages.setdefault((queue_name, queue_url), []).append((message, kwargs))
+
+    def flush(self):
+        with self._lock:
+            items, messages = self.items, self.messages
+            self.items, self.messages = {}, {}
+
+        if not items and not messages:
+            return
+
+        errors, unprocessed = [], []
+        with phase('write_behind'):
+            for table_name, table_items in items.items():
+                try:
+                    dynamodb.batch_write_item(table_name, PutItems=_dedupe(table_name, table_items))
+                except BatchOperationException as e:
+                    errors += [(table_name, error) for _, error in e.errors]
+                    unprocessed += e.unprocessed
+                except Exception as e:
+                    errors.append((table_name, e))
+
+            for (queue_name, queue_url), entries in messages.items():
+                try:
+                    response = sqs._send_message_entries(queue_name, entries, queue_url=queue_url)
+                except Exception as e:
+                    errors.append((queue_name, e))
+                    continue
+
+                for failed in response['Failed']:
+                    message, kwargs = entries[int(failed['Id'])]
+                    unprocessed.append({'QueueName': queue_name, 'Message': message, **kwargs, 'Error': failed})
+
+        if errors or unprocessed:
+            raise BatchOperationException(
+                f'write-behind flush failed for {len(errors)} request(s) and left {len(unprocessed)} unprocessed',
+                errors=errors,
+                unprocessed=unprocessed,
+            )
+
+
+@contextmanager
+def write_behind():
+    buffer = WriteBehindBuffer()
+    token = WriteBehind.set(buffer)
+    try:
+        yield buffer
+    except BaseException:
+        try:
+            buffer.flush()
+        except Exception as e:
+            log(level=LogLevel.ERROR, event='write_behind_failed', args={'error': str(e)})
+        raise
+    else:
+        buffer.flush()
+    finally:
+        WriteBehind.reset(token)
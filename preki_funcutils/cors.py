@@ -0,0 +1,72 @@
+import os
+import re
+from functools import lru_cache
+
+DEFAULT_ALLOWED_HOSTS = [
+    'preki.com',
+    'preki.co',
+    'preki.com.pa',
+    'preki.com.py',
+    'preki.sv',
+    'preki.com.ni',
+    'preki.ar',
+    'preki.com.ve',
+    'preki.com.br',
+    'preki.hn',
+    'preki.ec',
+    'preki.pe',
+    'preki.cr',
+    'preki.mx',
+    'preki.do',
+    'preki.gt',
+    'preki.bo',
+    'preki.cl',
+    'preki.uy',
+]
+ORIGIN_CACHE_SIZE = int(os.environ.get('PREKI_CORS_ORIGIN_CACHE_SIZE', '1024'))
+
+LOCALHOST_PATTERN = r'((http|https|capacitor):\/\/)?localhost((:|\/).+)?$'
+
+_allowed_hosts = []
+_patterns = None
+
+
+def _compile(hosts):
+    if not hosts:
+        return None
+
+    alternation = '|'.join(re.escape(host) for host in hosts)
+    return re.compile(rf'^((http|https|capacitor):\/\/)?([a-zA-Z0-9]*\.)*({alternation})((\.[a-zA-Z]+)+)?(\/.*)?$')
+
+
+def get_allowed_hosts():
+    return list(_allowed_hosts)
+
+
+def set_allowed_hosts(hosts):
+    global _allowed_hosts, _patterns
+    _allowed_hosts = list(hosts)
+    _patterns = None
+    is_allowed_origin.cache_clear()
+
+
+def _get_patterns():
+    global _patterns
+    if _patterns is None:
+        _patterns = _compile(_allowed_hosts), re.compile(LOCALHOST_PATTERN)
+    return _patterns
+
+
+@lru_cache(maxsize=ORIGIN_CACHE_SIZE)
+def is_allowed_origin(origin, stage):
+    allowed_hosts_pattern, localhost_pattern = _get_patterns()
+    if allowed_hosts_pattern is not None and allowed_hosts_pattern.match(origin):
+        return True
+
+    return stage == 'dev' and bool(localhost_pattern.match(origin))
+
+
+if os.environ.get('PREKI_ALLOWED_HOSTS'):
+    set_allowed_hosts([host.strip() for host in os.environ['PREKI_ALLOWED_HOSTS'].split(',') if host.strip()])
+else:
+    set_allowed_hosts(DEFAULT_ALLOWED_HOSTS)
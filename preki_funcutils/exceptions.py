@@ -18,3 +18,35 @@ class PrekiException(Exception):
         self.error_code = error_code
         self.data = data
         self.force_error = force_error
+
+
+class BatchOperationException(Exception):
+
+    def __init__(
+        self,
+        message: str,
+        results: Optional[list] = None,
+        errors: Optional[list] = None,
+        unprocessed: Optional[list] = None,
+    ):
+        super().__init__(message)
+        self.message = message
+        self.results = results
+        self.errors = errors or []
+        self.unprocessed = unprocessed or []
+
+
+class LambdaInvocationException(Exception):
+
+    def __init__(
+        self,
+        message: str,
+        function_name: Optional[str] = None,
+        error_type: Optional[str] = None,
+        payload: Optional[dict] = None,
+    ):
+        super().__init__(message)
+        self.message = message
+        self.function_name = function_name
+        self.error_type = error_type
+        self.payload = payload
@@ -1,46 +1,25 @@
-import json
-import re
-from functools import wraps
-from preki_funcutils.logger import LogLevel, log
-from .utils import parse_message, Parser
-from .internals import LambdaContext, LambdaEvent, Protocol, find_entity
+import time
+from contextlib import nullcontext
+from functools import partial, wraps
+from types import CoroutineType
+from preki_funcutils.logger import LogLevel, log, flush as flush_logs
+from .utils import MAX_WORKERS, parse_message, run_concurrently, Parser
+from .cors import is_allowed_origin
+from .serializers import get_serializer
+from .router import Router
+from .records import decode_sqs_body, sqs_record, sns_record
+from .metrics import emit as emit_metrics, phase, start_invocation
+from .internals import LambdaContext, LambdaDeadline, LambdaEvent, Protocol, find_entity
 from . import status, exceptions
 
+_event_loop = None
 
-def _make_response(origin, stage, body, status_code=status.HTTP_200_OK, allowed_origin=None):
+
+def _make_response(origin, stage, body, status_code=status.HTTP_200_OK, allowed_origin=None, serializer=None):
     if allowed_origin is not None:
         allowed_origin = f'https://{allowed_origin}'
 
-    allowed_hosts = [
-        'preki.com',
-        'preki.co',
-        'preki.com.pa',
-        'preki.com.py',
-        'preki.sv',
-        'preki.com.ni',
-        'preki.ar',
-        'preki.com.ve',
-        'preki.com.br',
-        'preki.hn',
-        'preki.ec',
-        'preki.pe',
-        'preki.cr',
-        'preki.mx',
-        'preki.do',
-        'preki.gt',
-        'preki.bo',
-        'preki.cl',
-        'preki.uy',
-    ]
-
-    is_allowed = bool([
-        host for host in allowed_hosts if re.match(
-            rf'^((http|https|capacitor):\/\/)?([a-zA-Z0-9]*\.)*{re.escape(host)}((\.[a-zA-Z]+)+)?(\/.*)?$', origin)
-    ])
-
-    if not is_allowed:
-        is_localhost = re.match(r'((http|https|capacitor):\/\/)?localhost((:|\/).+)?$', origin)
-        is_allowed = stage == 'dev' and is_localhost
+    is_allowed = is_allowed_origin(origin, stage)
 
     return {
         'statusCode': status_code,
@@ -50,13 +29,20 @@ def _make_response(origin, stage, body, status_code=status.HTTP_200_OK, allowed_
             'Access-Control-Allow-Credentials': True,
             'Access-Control-Allow-Headers': 'App-Version',
         },
-        'body': json.dumps(body)
+        'body': get_serializer(serializer).dumps(body)
     }
 
 
-def _make_error(origin, stage, type, message, error_code, status_code, data):
+def _make_error(origin, stage, type, message, error_code, status_code, data, serializer=None):
     error = {'type': type, 'message': message, 'error_code': error_code}
-    return _make_response(origin=origin, stage=stage, body={'error': error, 'data': data}, status_code=status_code)
+    return _make_response(origin=origin,
+                          stage=stage,
+                          body={
+                              'error': error,
+                              'data': data
+                          },
+                          status_code=status_code,
+                          serializer=serializer)
 
 
 def _determine_protocol(event):
@@ -84,11 +70,19 @@ def _set_lambda_context(context):
         'function_version': context.function_version,
     })
 
+    if hasattr(context, 'get_remaining_time_in_millis'):
+        LambdaDeadline.set(time.monotonic() + context.get_remaining_time_in_millis() / 1000)
+
 
-def _set_lambda_event(protocol: Protocol, event):
+def _set_lambda_event(protocol: Protocol, event, match=None):
     extra = {}
     if protocol == Protocol.HTTP:
-        if 'path' in event:
+        if match is not None and match.route is not None:
+            entity, id = match.entity_type, match.entity_id
+            extra = {'entity_type': entity, 'route': match.route.template}
+            if id is not None:
+                extra['entity_id'] = id
+        elif 'path' in event:
             path = event['path']
             entity, id = find_entity(path=path)
             extra = {'entity_type': entity}
@@ -103,10 +97,147 @@ def _set_lambda_event(protocol: Protocol, event):
     })
 
 
-def lambda_response(func):
+def _parse_event(protocol: Protocol, event, serializer=None, lazy_records=False):
+    if protocol == Protocol.HTTP:
+        event['body'], event['bodyString'] = parse_message(event.get('body', None) or '{}',
+                                                           serializer=serializer), event.get('body')
+        event['queryStringParameters'] = event.get('queryStringParameters', None) or {}
+        event['pathParameters'] = event.get('pathParameters', None) or {}
+    elif protocol == Protocol.SQS:
+        if lazy_records:
+            event['Records'] = [sqs_record(r, serializer=serializer) for r in event['Records']]
+            return
+
+        for i, r in enumerate(event['Records']):
+            event['Records'][i]['body'] = decode_sqs_body(r['body'], serializer=serializer)
+    elif protocol == Protocol.SNS:
+        if lazy_records:
+            event['Records'] = [sns_record(r, serializer=serializer) for r in event['Records']]
+            return
+
+        for i, r in enumerate(event['Records']):
+            event['Records'][i]['Sns']['Message'] = parse_message(r['Sns']['Message'], serializer=serializer)
+    elif protocol == Protocol.DYNAMODB:
+        for i, r in enumerate(event['Records']):
+            event['Records'][i]['dynamodb']['Keys'] = Parser.to_number(r['dynamodb']['Keys'])
+
+
+def _record_error_is_handled(record, e):
+    if isinstance(e, exceptions.PrekiException):
+        if not e.force_error:
+            return True
+
+        log(level=LogLevel.ERROR, event='record_failed', args={'error': e.message, 'message_id': record['messageId']})
+        return False
+
+    log(level=LogLevel.CRITICAL, event='record_failed', args={'error': str(e), 'message_id': record['messageId']})
+    return False
+
+
+def _process_record(func, record, context, *args, **kwargs):
+    try:
+        func(record, context, *args, **kwargs)
+        return True
+    except Exception as e:
+        return _record_error_is_handled(record, e)
+
+
+async def _process_record_async(func, record, context, *args, **kwargs):
+    try:
+        await func(record, context, *args, **kwargs)
+        return True
+    except Exception as e:
+        return _record_error_is_handled(record, e)
+
+
+def _is_fifo(records):
+    return bool(records) and records[0].get('eventSourceARN', '').endswith('.fifo')
+
+
+def _process_records(func, records, context, max_workers, *args, **kwargs):
+
+    def process(record):
+        return _process_record(func, record, context, *args, **kwargs)
+
+    if _is_fifo(records):
+        for i, record in enumerate(records):
+            if not process(record):
+                return records[i:]
+        return []
+
+    results = run_concurrently(process, records, max_workers=max_workers)
+    return [record for record, (succeeded, _) in zip(records, results) if not succeeded]
+
+
+async def _process_records_async(func, records, context, max_workers, *args, **kwargs):
+    import asyncio
+
+    if _is_fifo(records):
+        for i, record in enumerate(records):
+            if not await _process_record_async(func, record, context, *args, **kwargs):
+                return records[i:]
+        return []
+
+    semaphore = asyncio.Semaphore(max_workers or MAX_WORKERS)
+
+    async def process(record):
+        async with semaphore:
+            return await _process_record_async(func, record, context, *args, **kwargs)
+
+    results = await asyncio.gather(*[process(record) for record in records])
+    return [record for record, succeeded in zip(records, results) if not succeeded]
+
+
+def _process_sqs_records(func, event, context, max_workers, *args, **kwargs):
+    import inspect
+
+    if inspect.iscoroutinefunction(func):
+        failed = _run_coroutine(_process_records_async(func, event['Records'], context, max_workers, *args, **kwargs))
+    else:
+        failed = _process_records(func, event['Records'], context, max_workers, *args, **kwargs)
+
+    return {'batchItemFailures': [{'itemIdentifier': record['messageId']} for record in failed]}
+
+
+def _run_coroutine(coroutine):
+    import asyncio
+    global _event_loop
+
+    if _event_loop is None or _event_loop.is_closed():
+        _event_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_event_loop)
+
+    return _event_loop.run_until_complete(coroutine)
+
+
+def lambda_response(func=None,
+                    *,
+                    serializer=None,
+                    lazy_records=False,
+                    per_record=False,
+                    max_workers=1,
+                    write_behind=False,
+                    idempotency=None):
+    if func is None:
+        return partial(lambda_response,
+                       serializer=serializer,
+                       lazy_records=lazy_records,
+                       per_record=per_record,
+                       max_workers=max_workers,
+                       write_behind=write_behind,
+                       idempotency=idempotency)
+
+    if write_behind:
+        from .boto.write_behind import write_behind as buffered_writes
+    else:
+        buffered_writes = nullcontext
+
+    is_router = isinstance(func, Router)
+    record_func = func if idempotency is None or not per_record else idempotency.wrap(func)
 
     @wraps(func)
     def wrapper(event, context, *args, **kwargs):
+        start_invocation()
         _set_lambda_context(context)
         protocol = _determine_protocol(event)
         headers = event.get('headers', {})
@@ -115,26 +246,37 @@ def lambda_response(func):
         allowed_origin = event.get('requestContext', {}).get('authorizer', {}).get('allowedURL', None)
 
         try:
-            if protocol == Protocol.HTTP:
-                event['body'], event['bodyString'] = parse_message(event.get('body', None) or '{}'), event.get('body')
-                event['queryStringParameters'] = event.get('queryStringParameters', None) or {}
-                event['pathParameters'] = event.get('pathParameters', None) or {}
-            elif protocol == Protocol.SQS:
-                for i, r in enumerate(event['Records']):
-                    body = parse_message(event['Records'][i]['body'])
-                    event['Records'][i]['body'] = body
-                    if isinstance(body, dict) and body.get('Type', '') == 'Notification' and 'Message' in body:
-                        event['Records'][i]['body']['Message'] = parse_message(body['Message'])
-            elif protocol == Protocol.SNS:
-                for i, r in enumerate(event['Records']):
-                    event['Records'][i]['Sns']['Message'] = parse_message(event['Records'][i]['Sns']['Message'])
-            elif protocol == Protocol.DYNAMODB:
-                for i, r in enumerate(event['Records']):
-                    event['Records'][i]['dynamodb']['Keys'] = Parser.to_number(event['Records'][i]['dynamodb']['Keys'])
-
-            _set_lambda_event(protocol=protocol, event=event)
-            response = func(event, context, *args, **kwargs)
-            return _make_response(origin=origin, stage=stage, body=response, allowed_origin=allowed_origin)
+            match = None
+            with phase('parse'):
+                _parse_event(protocol=protocol, event=event, serializer=serializer, lazy_records=lazy_records)
+                if is_router and protocol == Protocol.HTTP and 'path' in event:
+                    match = func.match(event.get('httpMethod'), event['path'])
+            _set_lambda_event(protocol=protocol, event=event, match=match)
+
+            with phase('handler'), buffered_writes():
+                if per_record and protocol == Protocol.SQS:
+                    return _process_sqs_records(record_func, event, context, max_workers, *args, **kwargs)
+
+                def call_handler():
+                    if match is not None:
+                        response = func.dispatch(match, event, context, *args, **kwargs)
+                    else:
+                        response = func(event, context, *args, **kwargs)
+                    if isinstance(response, CoroutineType):
+                        response = _run_coroutine(response)
+                    return response
+
+                if idempotency is None:
+                    response = call_handler()
+                else:
+                    response = idempotency.run(event, call_handler, force_error=protocol != Protocol.HTTP)
+
+            with phase('serialize'):
+                return _make_response(origin=origin,
+                                      stage=stage,
+                                      body=response,
+                                      allowed_origin=allowed_origin,
+                                      serializer=serializer)
         except exceptions.PrekiException as e:
             if e.force_error and protocol != Protocol.HTTP:
                 raise e
@@ -145,7 +287,8 @@ def lambda_response(func):
                                message=e.message,
                                error_code=e.error_code,
                                status_code=e.status_code,
-                               data=e.data)
+                               data=e.data,
+                               serializer=serializer)
         except Exception as e:
             log(level=LogLevel.CRITICAL, args={'error': str(e)})
             if protocol == Protocol.HTTP:
@@ -155,8 +298,12 @@ def lambda_response(func):
                                    message=str(e),
                                    error_code=None,
                                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                                   data=None)
+                                   data=None,
+                                   serializer=serializer)
             elif protocol == Protocol.SQS:
                 raise e
+        finally:
+            emit_metrics()
+            flush_logs()
 
     return wrapper
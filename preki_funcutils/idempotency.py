@@ -0,0 +1,273 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from enum import Enum
+from functools import wraps
+from .exceptions import PrekiException
+from .internals import LambdaContext, LambdaDeadline
+from .logger import LogLevel, log
+from .boto import dynamodb
+from . import status
+
+IDEMPOTENCY_TABLE = os.environ.get('PREKI_IDEMPOTENCY_TABLE')
+IDEMPOTENCY_TTL = int(os.environ.get('PREKI_IDEMPOTENCY_TTL', '3600'))
+IN_PROGRESS_TTL = int(os.environ.get('PREKI_IDEMPOTENCY_IN_PROGRESS_TTL', '900'))
+CACHE_SIZE = int(os.environ.get('PREKI_IDEMPOTENCY_CACHE_SIZE', '256'))
+
+
+class IdempotencyStatus(Enum):
+    IN_PROGRESS = 'IN_PROGRESS'
+    COMPLETED = 'COMPLETED'
+
+
+def _hash(data):
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def message_id_key(event):
+    if 'messageId' in event:
+        return event['messageId']
+
+    ids = [r.get('messageId') or r.get('Sns', {}).get('MessageId') for r in event.get('Records') or []]
+    if not ids or not all(ids):
+        return None
+    return ids[0] if len(ids) == 1 else _hash(','.join(ids))
+
+
+def header_key(name):
+    name = name.lower()
+
+    def key(event):
+        for header, value in (event.get('headers') or {}).items():
+            if header.lower() == name:
+                return value
+        return None
+
+    return key
+
+
+def body_key(fields=None):
+
+    def key(event):
+        body = event.get('body')
+        if fields is not None:
+            if not isinstance(body, dict):
+                return None
+            body = {f: body.get(f) for f in fields}
+        elif event.get('bodyString') is not None:
+            return _hash(event['bodyString'])
+
+        return _hash(json.dumps(body, sort_keys=True, default=str))
+
+    return key
+
+
+class MemoryStore:
+
+    def __init__(self, max_size=CACHE_SIZE):
+        self.max_size = max_size
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            record = self._records.get(key)
+            if record is None or record['expiration'] < time.time():
+                return None
+            self._records.move_to_end(key)
+            return copy.deepcopy(record)
+
+    def _set(self, key, record):
+        self._records[key] = record
+        self._records.move_to_end(key)
+        while len(self._records) > self.max_size:
+            self._records.popitem(last=False)
+
+    def start(self, key, expiration):
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None and record['expiration'] >= time.time():
+                return False
+            self._set(key, {'status': IdempotencyStatus.IN_PROGRESS.value, 'expiration': expiration})
+            return True
+
+    def complete(self, key, response, expiration):
+        with self._lock:
+            record = {'status': IdempotencyStatus.COMPLETED.value, 'response': response, 'expiration': expiration}
+            self._set(key, copy.deepcopy(record))
+
+    def delete(self, key):
+        with self._lock:
+            self._records.pop(key, None)
+
+
+class DynamoDBStore:
+
+    def __init__(self, table_name, key_attribute='id'):
+        self.table_name = table_name
+        self.key_attribute = key_attribute
+
+    def get(self, key):
+        record = dynamodb.get_item(self.table_name, {self.key_attribute: key}, ConsistentRead=True)
+        if record is None or record['expiration'] < time.time():
+            return None
+        return record
+
+    def start(self, key, expiration):
+        item = {
+            self.key_attribute: key,
+            'status': IdempotencyStatus.IN_PROGRESS.value,
+            'expiration': expiration,
+        }
+
+        try:
+            dynamodb._put_item(self.table_name,
+                               item,
+                               ConditionExpression='attribute_not_exists(#key) OR #expiration < :now',
+                               ExpressionAttributeNames={
+                                   '#key': self.key_attribute,
+                                   '#expiration': 'expiration',
+                               },
+                               ExpressionAttributeValues={':now': int(time.time())})
+            return True
+        except Exception as e:
+            if getattr(e, 'response', {}).get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def complete(self, key, response, expiration):
+        item = {
+            self.key_attribute: key,
+            'status': IdempotencyStatus.COMPLETED.value,
+            'response': response,
+            'expiration': expiration,
+        }
+        dynamodb._put_item(self.table_name, item)
+
+    def delete(self, key):
+        dynamodb.delete_item(self.table_name, {self.key_attribute: key})
+
+
+class Idempotency:
+
+    def __init__(self, key=message_id_key, table_name=IDEMPOTENCY_TABLE, ttl=IDEMPOTENCY_TTL, cache_size=CACHE_SIZE):
+        self.key = key
+        self.ttl = ttl
+        self.cache = MemoryStore(cache_size)
+        self.store = DynamoDBStore(table_name) if table_name else None
+
+    def _key(self, event):
+        key = self.key(event)
+        if key is None:
+            return None
+        return f'{LambdaContext.get().get("function_name", "")}#{key}'
+
+    def _in_progress_expiration(self):
+        deadline = LambdaDeadline.get()
+        if deadline is not None:
+            return int(time.time() + max(deadline - time.monotonic(), 0)) + 1
+        return int(time.time()) + IN_PROGRESS_TTL
+
+    def begin(self, key, force_error=False):
+        record = self.cache.get(key)
+        if record is None and self.store is not None:
+            record = self.store.get(key)
+            if record is not None and record['status'] == IdempotencyStatus.COMPLETED.value:
+                self.cache.complete(key, record['response'], record['expiration'])
+
+        if record is None:
+            expiration = self._in_progress_expiration()
+            if self.cache.start(key, expiration):
+                try:
+                    acquired = self.store is None or self.store.start(key, expiration)
+                except Exception:
+                    self.cache.delete(key)
+                    raise
+
+                if acquired:
+                    return False, None
+                self.cache.delete(key)
+
+        if record is not None and record['status'] == IdempotencyStatus.COMPLETED.value:
+            return True, record['response']
+
+        raise PrekiException('Request is already in progress',
+                             status_code=status.HTTP_409_CONFLICT,
+                             force_error=force_error)
+
+    def complete(self, key, response):
+        expiration = int(time.time()) + self.ttl
+        if self.store is not None:
+            try:
+                self.store.complete(key, response, expiration)
+            except Exception as e:
+                log(level=LogLevel.ERROR, event='idempotency_complete_failed', args={'key': key, 'error': str(e)})
+                self._release_quietly(key)
+                return
+
+        self.cache.complete(key, response, expiration)
+
+    def _release_quietly(self, key):
+        try:
+            self.release(key)
+        except Exception as e:
+            log(level=LogLevel.ERROR, event='idempotency_release_failed', args={'key': key, 'error': str(e)})
+
+    def release(self, key):
+        self.cache.delete(key)
+        if self.store is not None:
+            self.store.delete(key)
+
+    def run(self, event, call, force_error=False):
+        key = self._key(event)
+        if key is None:
+            return call()
+
+        found, response = self.begin(key, force_error=force_error)
+        if found:
+            return response
+
+        try:
+            response = call()
+        except BaseException:
+            self.release(key)
+            raise
+
+        self.complete(key, response)
+        return response
+
+    def wrap(self, func):
+        import inspect
+
+        if not inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            def wrapper(event, *args, **kwargs):
+                return self.run(event, lambda: func(event, *args, **kwargs), force_error=True)
+
+            return wrapper
+
+        @wraps(func)
+        async def async_wrapper(event, *args, **kwargs):
+            key = self._key(event)
+            if key is None:
+                return await func(event, *args, **kwargs)
+
+            found, response = self.begin(key, force_error=True)
+            if found:
+                return response
+
+            try:
+                response = await func(event, *args, **kwargs)
+            except BaseException:
+                self.release(key)
+                raise
+
+            self.complete(key, response)
+            return response
+
+        return async_wrapper
@@ -5,6 +5,8 @@ import logging
 LambdaContext = ContextVar('LambdaContext', default={})
 LambdaEvent = ContextVar('LambdaEvent', default={})
 LogLevelContext = ContextVar('LambdaEvent', default=logging.INFO)
+LambdaDeadline = ContextVar('LambdaDeadline', default=None)
+WriteBehind = ContextVar('WriteBehind', default=None)
 
 
 class Protocol(Enum):
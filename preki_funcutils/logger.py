@@ -1,20 +1,22 @@
 import logging
 import json
+import os
+import queue
+import random
+import threading
+import time
 from enum import Enum
 from typing import Optional
 from .internals import LambdaContext, LambdaEvent, LogLevelContext
 
 PREKI_LOGGER_ID_KEY = 'logger_id'
 PREKI_LOGGER_ID = 'preki-logger'
-PREKI_LOGGER_ID = 'preki-logger'
 
-logger = logging.getLogger(PREKI_LOGGER_ID)
-for h in logger.handlers:
-    logger.removeHandler(h)
-logger_handler = logging.StreamHandler()
-logger_handler.setFormatter(logging.Formatter('%(message)s'))
-logger.addHandler(logger_handler)
-logger.propagate = False
+ASYNC_LOGGING = os.environ.get('PREKI_LOG_ASYNC', '').lower() in ('1', 'true', 'yes')
+BUFFER_SIZE = int(os.environ.get('PREKI_LOG_BUFFER_SIZE', '10000'))
+OVERFLOW_POLICY = os.environ.get('PREKI_LOG_OVERFLOW', 'drop')
+OVERFLOW_SAMPLE_RATE = int(os.environ.get('PREKI_LOG_OVERFLOW_SAMPLE_RATE', '10'))
+SUMMARY_INTERVAL = float(os.environ.get('PREKI_LOG_SUMMARY_INTERVAL', '60'))
 
 
 class LogLevel(Enum):
@@ -24,6 +26,12 @@ class LogLevel(Enum):
     CRITICAL = logging.CRITICAL
 
 
+class OverflowPolicy(Enum):
+    DROP = 'drop'
+    BLOCK = 'block'
+    SAMPLE = 'sample'
+
+
 def parse(data):
     try:
         return json.dumps(data)
@@ -31,13 +39,177 @@ def parse(data):
         return data
 
 
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        if isinstance(record.msg, dict):
+            record.msg = parse(record.msg)
+        return super().format(record)
+
+
+class BufferedHandler(logging.Handler):
+
+    def __init__(self, buffer, overflow=OverflowPolicy.DROP, sample_rate=OVERFLOW_SAMPLE_RATE):
+        super().__init__()
+        self.queue = buffer
+        self.overflow = OverflowPolicy(overflow)
+        self.sample_rate = max(sample_rate, 1)
+        self.dropped = 0
+        self._overflowed = 0
+
+    def emit(self, record):
+        try:
+            self.enqueue(record)
+        except Exception:
+            self.handleError(record)
+
+    def enqueue(self, record):
+        if record.levelno >= logging.ERROR or self.overflow == OverflowPolicy.BLOCK:
+            self.queue.put(record)
+            return
+
+        if self.overflow == OverflowPolicy.SAMPLE and self.queue.qsize() >= self.queue.maxsize // 2:
+            self._overflowed += 1
+            if self._overflowed % self.sample_rate:
+                self.dropped += 1
+                return
+
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class TokenBucket:
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+logger = logging.getLogger(PREKI_LOGGER_ID)
+logger_handler = logging.StreamHandler()
+logger_handler.setFormatter(JsonFormatter('%(message)s'))
+logger.setLevel(logging.DEBUG)
+logger.propagate = False
+
+_configured = False
+_buffered_handler = None
+_listener = None
+
+_sampling = {}
+_rate_limits = {}
+_suppressed = {}
+_suppressed_lock = threading.Lock()
+_last_summary = time.monotonic()
+
+
+def configure(async_logging=ASYNC_LOGGING,
+              buffer_size=BUFFER_SIZE,
+              overflow=OVERFLOW_POLICY,
+              sample_rate=OVERFLOW_SAMPLE_RATE):
+    global _configured, _buffered_handler, _listener
+    _configured = True
+
+    if _listener is not None:
+        flush()
+        _listener.stop()
+        logger.removeHandler(_buffered_handler)
+        _buffered_handler, _listener = None, None
+
+    logger.removeHandler(logger_handler)
+
+    if not async_logging:
+        logger.addHandler(logger_handler)
+        return
+
+    from logging.handlers import QueueListener
+
+    buffer = queue.Queue(maxsize=buffer_size)
+    _buffered_handler = BufferedHandler(buffer, overflow=overflow, sample_rate=sample_rate)
+    _listener = QueueListener(buffer, logger_handler)
+    _listener.start()
+    logger.addHandler(_buffered_handler)
+
+
+def set_sampling(rate: float, event: Optional[str] = None, level: LogLevel = LogLevel.INFO):
+    _sampling[(event, level)] = rate
+
+
+def set_rate_limit(event: Optional[str], per_second: float, burst: Optional[int] = None):
+    _rate_limits[event] = TokenBucket(rate=per_second, capacity=burst or max(per_second, 1))
+
+
+def reset_limits():
+    _sampling.clear()
+    _rate_limits.clear()
+
+
+def _is_allowed(level: LogLevel, event):
+    if level.value >= logging.ERROR:
+        return True
+
+    rate = _sampling.get((event, level), _sampling.get((None, level)))
+    if rate is not None and random.random() >= rate:
+        return False
+
+    bucket = _rate_limits.get(event)
+    return bucket is None or bucket.consume()
+
+
+def _suppress(level: LogLevel, event):
+    with _suppressed_lock:
+        key = (event, level.name)
+        _suppressed[key] = _suppressed.get(key, 0) + 1
+
+
+def _emit_summary(force=False):
+    global _last_summary
+    now = time.monotonic()
+    if not _suppressed or (not force and now - _last_summary < SUMMARY_INTERVAL):
+        return
+
+    with _suppressed_lock:
+        suppressed = [{'event': event, 'level': level, 'count': count} for (event, level), count in _suppressed.items()]
+        _suppressed.clear()
+        interval, _last_summary = now - _last_summary, now
+
+    _log(LogLevel.INFO, event='logs_suppressed', args={'suppressed': suppressed, 'interval': interval})
+
+
+def flush():
+    _emit_summary()
+    if _listener is not None:
+        _listener.queue.join()
+    logger_handler.flush()
+
+
+def dropped_count():
+    return _buffered_handler.dropped if _buffered_handler is not None else 0
+
+
 def _log(level: LogLevel = LogLevel.INFO, event=None, args={}):
+    if not _configured:
+        configure()
+
     args = args or {}
     lambda_context = LambdaContext.get()
     lambda_event = LambdaEvent.get()
 
     exec_info = True if level in [LogLevel.ERROR, LogLevel.CRITICAL] else None
-    logger.setLevel(LogLevelContext.get())
 
     if level in [LogLevel.ERROR, LogLevel.CRITICAL]:
         import traceback
@@ -47,20 +219,29 @@ def _log(level: LogLevel = LogLevel.INFO, event=None, args={}):
 
     logger.log(
         level=level.value,
-        msg=parse({
+        msg={
             **args,
             **lambda_context,
             **lambda_event,
             'event': event,
             'level': level.name,
             PREKI_LOGGER_ID_KEY: PREKI_LOGGER_ID,
-        }),
+        },
         exc_info=exec_info,
     )
 
 
 def log(level: LogLevel = LogLevel.INFO, event: Optional[str] = None, args={}):
+    if level.value < LogLevelContext.get():
+        return
+
     try:
+        if _sampling or _rate_limits:
+            if not _is_allowed(level, event):
+                _suppress(level, event)
+                return
+            _emit_summary()
+
         _log(level=level, event=event, args=args)
     except Exception as e:
         _log(LogLevel.CRITICAL, event='log_failed', args={'error': str(e)})
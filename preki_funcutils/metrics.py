@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from .internals import LambdaEvent
+from .logger import LogLevel, _log
+
+METRICS_NAMESPACE = os.environ.get('PREKI_METRICS_NAMESPACE', 'Preki/Functions')
+DIMENSIONS = ['protocol', 'entity_type']
+
+InvocationMetrics = ContextVar('InvocationMetrics', default=None)
+CurrentCall = ContextVar('CurrentCall', default=None)
+
+_enabled = os.environ.get('PREKI_METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+_noop = nullcontext()
+
+
+class Metrics:
+
+    def __init__(self):
+        self.phases = {}
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def add_phase(self, name, duration):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0) + duration
+
+    def add_call(self, name, duration, items, retries):
+        with self._lock:
+            call = self.calls.setdefault(name, {'calls': 0, 'duration': 0, 'items': 0, 'retries': 0})
+            call['calls'] += 1
+            call['duration'] += duration
+            call['items'] += items
+            call['retries'] += retries
+
+
+class _Phase:
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_phase(self.name, (time.perf_counter() - self.start) * 1000)
+
+
+class _Call:
+
+    def __init__(self, metrics, name, items=None):
+        self.metrics = metrics
+        self.name = name
+        self.items = items
+        self.retries = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._token = CurrentCall.set(self)
+        return self
+
+    def add_retries(self, retries):
+        with self.metrics._lock:
+            self.retries += retries
+
+    def __exit__(self, *exc):
+        CurrentCall.reset(self._token)
+        self.metrics.add_call(self.name, (time.perf_counter() - self.start) * 1000, self.items or 0, self.retries)
+
+
+def enable(enabled=True):
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def start_invocation():
+    metrics = Metrics() if _enabled else None
+    InvocationMetrics.set(metrics)
+    return metrics
+
+
+def phase(name):
+    metrics = InvocationMetrics.get()
+    return _noop if metrics is None else _Phase(metrics, name)
+
+
+def call(service, operation, items=None):
+    metrics = InvocationMetrics.get()
+    return _noop if metrics is None else _Call(metrics, f'{service}.{operation}', items=items)
+
+
+def count_items(items):
+    current = CurrentCall.get()
+    if current is not None:
+        current.items = items
+
+
+def count_retries(retries):
+    current = CurrentCall.get()
+    if current is not None and retries:
+        current.add_retries(retries)
+
+
+def count_response_retries(response):
+    if CurrentCall.get() is None or not isinstance(response, dict):
+        return
+
+    retries = response.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+    if isinstance(retries, int):
+        count_retries(retries)
+
+
+def _count_result(result):
+    if result is None:
+        return 0
+    if isinstance(result, tuple):
+        result = result[0]
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+
+def instrument(service, operation=None, items=None):
+
+    def decorator(func):
+        name = operation or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = InvocationMetrics.get()
+            if metrics is None:
+                return func(*args, **kwargs)
+
+            with _Call(metrics, f'{service}.{name}', items=items) as current:
+                result = func(*args, **kwargs)
+                if current.items is None:
+                    current.items = _count_result(result)
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def to_emf(metrics: Metrics):
+    lambda_event = LambdaEvent.get()
+    dimensions = {d: str(lambda_event[d]) for d in DIMENSIONS if lambda_event.get(d) is not None}
+
+    timestamp = int(time.time() * 1000)
+    values, definitions = {}, []
+    for name, duration in metrics.phases.items():
+        values[f'phase.{name}'] = duration
+        definitions.append({'Name': f'phase.{name}', 'Unit': 'Milliseconds'})
+
+    for name, call_metrics in metrics.calls.items():
+        for key, value in call_metrics.items():
+            values[f'{name}.{key}'] = value
+            definitions.append({'Name': f'{name}.{key}', 'Unit': 'Milliseconds' if key == 'duration' else 'Count'})
+
+    directive = {
+        'Namespace': METRICS_NAMESPACE,
+        'Dimensions': [list(dimensions)],
+        'Metrics': definitions,
+    }
+
+    return {
+        '_aws': {
+            'Timestamp': timestamp,
+            'CloudWatchMetrics': [directive],
+        },
+        **dimensions,
+        **values,
+    }
+
+
+def emit():
+    metrics = InvocationMetrics.get()
+    if metrics is None:
+        return
+
+    InvocationMetrics.set(None)
+    if metrics.phases or metrics.calls:
+        _log(LogLevel.INFO, event='metrics', args=to_emf(metrics))
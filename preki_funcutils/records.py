@@ -0,0 +1,58 @@
+from collections.abc import MutableMapping
+from functools import partial
+from .utils import parse_message
+
+
+class LazyRecord(MutableMapping):
+
+    def __init__(self, data, decoders):
+        self._data = data
+        self._decoders = decoders
+        self._decoded = set()
+
+    def __getitem__(self, key):
+        value = self._data[key]
+        if key in self._decoders and key not in self._decoded:
+            value = self._data[key] = self._decoders[key](value)
+            self._decoded.add(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+        self._decoded.add(key)
+
+    def __delitem__(self, key):
+        del self._data[key]
+        self._decoded.discard(key)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self._data!r})'
+
+    @property
+    def raw(self):
+        return self._data
+
+
+def decode_sqs_body(body, serializer=None):
+    body = parse_message(body, serializer=serializer)
+    if isinstance(body, dict) and body.get('Type', '') == 'Notification' and 'Message' in body:
+        body['Message'] = parse_message(body['Message'], serializer=serializer)
+    return body
+
+
+def sqs_record(record, serializer=None):
+    return LazyRecord(record, {'body': partial(decode_sqs_body, serializer=serializer)})
+
+
+def _sns_payload(sns, serializer=None):
+    return LazyRecord(sns, {'Message': partial(parse_message, serializer=serializer)})
+
+
+def sns_record(record, serializer=None):
+    return LazyRecord(record, {'Sns': partial(_sns_payload, serializer=serializer)})
@@ -0,0 +1,148 @@
+from .exceptions import PrekiException
+from . import status
+
+
+def _split(path):
+    return [s for s in (path or '').split('/') if s]
+
+
+def _param_name(segment):
+    if segment.startswith('{') and segment.endswith('}'):
+        return segment[1:-1]
+    return None
+
+
+class Route:
+
+    def __init__(self, method, template, handler):
+        self.method = method
+        self.template = template
+        self.handler = handler
+
+        segments = _split(template)
+        self.entity_type_param = _param_name(segments[0]) if segments else None
+        self.entity_type = segments[0] if segments and self.entity_type_param is None else None
+        self.entity_id_param = _param_name(segments[1]) if len(segments) > 1 else None
+
+
+class Match:
+
+    def __init__(self, route=None, params=None, allowed=None):
+        self.route = route
+        self.params = params or {}
+        self.allowed = allowed or []
+
+    @property
+    def entity_type(self):
+        if self.route is None:
+            return None
+        return self.route.entity_type or self.params.get(self.route.entity_type_param)
+
+    @property
+    def entity_id(self):
+        if self.route is None or self.route.entity_id_param is None:
+            return None
+        return self.params.get(self.route.entity_id_param)
+
+
+class _Node:
+
+    def __init__(self):
+        self.children = {}
+        self.param = None
+        self.param_name = None
+        self.routes = {}
+
+
+class Router:
+
+    def __init__(self):
+        self._root = _Node()
+
+    def add(self, method, template, handler):
+        node = self._root
+        for segment in _split(template):
+            name = _param_name(segment)
+            if name is None:
+                node = node.children.setdefault(segment, _Node())
+                continue
+
+            if node.param is None:
+                node.param, node.param_name = _Node(), name
+            elif node.param_name != name:
+                raise Exception(f'Conflicting path parameter {{{name}}} in {template}, '
+                                f'expected {{{node.param_name}}}')
+            node = node.param
+
+        method = method.upper()
+        if method in node.routes:
+            raise Exception(f'Route {method} {template} is already registered')
+        node.routes[method] = Route(method, template, handler)
+
+    def route(self, method, template):
+
+        def decorator(func):
+            self.add(method, template, func)
+            return func
+
+        return decorator
+
+    def get(self, template):
+        return self.route('GET', template)
+
+    def post(self, template):
+        return self.route('POST', template)
+
+    def put(self, template):
+        return self.route('PUT', template)
+
+    def patch(self, template):
+        return self.route('PATCH', template)
+
+    def delete(self, template):
+        return self.route('DELETE', template)
+
+    def _find(self, node, segments, i, params):
+        if i == len(segments):
+            return node if node.routes else None
+
+        child = node.children.get(segments[i])
+        if child is not None:
+            found = self._find(child, segments, i + 1, params)
+            if found is not None:
+                return found
+
+        if node.param is not None:
+            params[node.param_name] = segments[i]
+            found = self._find(node.param, segments, i + 1, params)
+            if found is not None:
+                return found
+            del params[node.param_name]
+
+        return None
+
+    def match(self, method, path):
+        params = {}
+        node = self._find(self._root, _split(path), 0, params)
+        if node is None:
+            return Match()
+
+        route = node.routes.get((method or '').upper())
+        if route is None:
+            return Match(allowed=sorted(node.routes))
+        return Match(route, params)
+
+    def dispatch(self, match, event, context, *args, **kwargs):
+        if match.route is None:
+            if match.allowed:
+                raise PrekiException(f'Method {event.get("httpMethod")} not allowed',
+                                     status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
+                                     data={'allowed': match.allowed})
+            raise PrekiException(f'Route {event.get("path")} not found', status_code=status.HTTP_404_NOT_FOUND)
+
+        event['pathParameters'] = {**(event.get('pathParameters') or {}), **match.params}
+        return match.route.handler(event, context, *args, **kwargs)
+
+    def __call__(self, event, context, *args, **kwargs):
+        match = self.match(event.get('httpMethod'), event.get('path'))
+        return self.dispatch(match, event, context, *args, **kwargs)
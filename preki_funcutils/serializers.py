@@ -0,0 +1,131 @@
+import json
+import math
+import os
+from collections.abc import Mapping
+from decimal import Decimal
+
+DEFAULT_BACKEND = os.environ.get('PREKI_JSON_BACKEND', 'auto')
+AUTO_BACKENDS = ['orjson', 'ujson', 'json']
+
+
+def _default(o):
+    if isinstance(o, Decimal):
+        return float(o) if o % 1 != 0 else int(o)
+    if isinstance(o, Mapping):
+        return dict(o)
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+def _has_non_finite(data):
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        value_type = type(value)
+        if value_type is dict:
+            stack.extend(value.values())
+        elif value_type is list or value_type is tuple:
+            stack.extend(value)
+        elif value_type is str or value_type is int or value is None or value_type is bool:
+            continue
+        elif isinstance(value, (float, Decimal)):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, Mapping):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+class JSONSerializer:
+    name = 'json'
+
+    def dumps(self, data, ensure_ascii=True):
+        return json.dumps(data, ensure_ascii=ensure_ascii, default=_default)
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonSerializer(JSONSerializer):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, data, ensure_ascii=True):
+        try:
+            encoded = self._orjson.dumps(data, default=_default, option=self._orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return super().dumps(data, ensure_ascii=ensure_ascii)
+
+        if b'null' in encoded and _has_non_finite(data):
+            return super().dumps(data, ensure_ascii=ensure_ascii)
+        return encoded.decode('utf-8')
+
+    def loads(self, data):
+        try:
+            return self._orjson.loads(data)
+        except ValueError:
+            return super().loads(data)
+
+
+class UjsonSerializer(JSONSerializer):
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def dumps(self, data, ensure_ascii=True):
+        try:
+            return self._ujson.dumps(data, ensure_ascii=ensure_ascii, escape_forward_slashes=False, default=_default)
+        except (TypeError, OverflowError):
+            return super().dumps(data, ensure_ascii=ensure_ascii)
+
+    def loads(self, data):
+        try:
+            return self._ujson.loads(data)
+        except ValueError:
+            return super().loads(data)
+
+
+BACKENDS = {
+    'orjson': OrjsonSerializer,
+    'ujson': UjsonSerializer,
+    'json': JSONSerializer,
+}
+
+_serializers = {}
+_default_backend = DEFAULT_BACKEND
+
+
+def _load(name):
+    if name not in _serializers:
+        _serializers[name] = BACKENDS[name]()
+    return _serializers[name]
+
+
+def get_serializer(backend=None):
+    if isinstance(backend, JSONSerializer):
+        return backend
+
+    backend = backend or _default_backend
+    if backend != 'auto':
+        return _load(backend)
+
+    if 'auto' not in _serializers:
+        for name in AUTO_BACKENDS:
+            try:
+                _serializers['auto'] = _load(name)
+                break
+            except ImportError:
+                continue
+
+    return _serializers['auto']
+
+
+def set_default_serializer(backend):
+    global _default_backend
+    _default_backend = backend
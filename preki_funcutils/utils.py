@@ -1,7 +1,12 @@
+import contextvars
 import json
+import math
+import os
 from decimal import Decimal
+from .serializers import get_serializer
 
 LIST_SEPARATOR = '@@'
+MAX_WORKERS = int(os.environ.get('PREKI_MAX_WORKERS', '8'))
 
 
 def chunks(lst, n):
@@ -9,17 +14,38 @@ def chunks(lst, n):
         yield lst[i:i + n]
 
 
-def stringify_message(message):
+def _capture(func, item):
+    try:
+        return func(item), None
+    except Exception as e:
+        return None, e
+
+
+def run_concurrently(func, items, max_workers=None):
+    items = list(items)
+    max_workers = min(max_workers or MAX_WORKERS, len(items))
+
+    if max_workers <= 1:
+        return [_capture(func, item) for item in items]
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, _capture, func, item) for item in items]
+        return [future.result() for future in futures]
+
+
+def stringify_message(message, serializer=None):
     if isinstance(message, dict):
-        return json.dumps(message, ensure_ascii=False)
+        return get_serializer(serializer).dumps(message, ensure_ascii=False)
     elif isinstance(message, list):
         return LIST_SEPARATOR.join([str(i) for i in message])
     return str(message)
 
 
-def parse_message(message):
+def parse_message(message, serializer=None):
     try:
-        return json.loads(message)
+        return get_serializer(serializer).loads(message)
     except json.decoder.JSONDecodeError:
         if LIST_SEPARATOR in message:
             return message.split(LIST_SEPARATOR)
@@ -34,15 +60,82 @@ class DecimalEncoder(json.JSONEncoder):
         return super(DecimalEncoder, self).default(o)
 
 
+_SCALAR_TYPES = (str, int, bool, type(None))
+
+
+def _decimal_to_number(value):
+    return float(value) if value % 1 != 0 else int(value)
+
+
+def _float_to_decimal(value):
+    return Decimal(repr(value)) if math.isfinite(value) else value
+
+
+def _convert_other(data, convert, leaf_type, convert_leaf):
+    if isinstance(data, dict):
+        return {key: convert(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [convert(value) for value in data]
+    if isinstance(data, frozenset):
+        return frozenset(convert(value) for value in data)
+    if isinstance(data, set):
+        return {convert(value) for value in data}
+    if isinstance(data, leaf_type):
+        return convert_leaf(data)
+    return data
+
+
+def _convert_in_place(data, convert):
+    if isinstance(data, dict):
+        for key, value in data.items():
+            data[key] = _convert_in_place(value, convert)
+        return data
+    if isinstance(data, list):
+        for i, value in enumerate(data):
+            data[i] = _convert_in_place(value, convert)
+        return data
+    return convert(data)
+
+
+def _to_number(data):
+    cls = type(data)
+    if cls is dict:
+        return {key: _to_number(value) for key, value in data.items()}
+    if cls is list:
+        return [_to_number(value) for value in data]
+    if cls is Decimal:
+        return float(data) if data % 1 != 0 else int(data)
+    if cls in _SCALAR_TYPES:
+        return data
+    return _convert_other(data, _to_number, Decimal, _decimal_to_number)
+
+
+def _to_decimal(data):
+    cls = type(data)
+    if cls is dict:
+        return {key: _to_decimal(value) for key, value in data.items()}
+    if cls is list:
+        return [_to_decimal(value) for value in data]
+    if cls is float:
+        return _float_to_decimal(data)
+    if cls in _SCALAR_TYPES:
+        return data
+    return _convert_other(data, _to_decimal, float, _float_to_decimal)
+
+
 class Parser:
 
     @staticmethod
-    def to_number(data):
-        return json.loads(json.dumps(data, cls=DecimalEncoder))
+    def to_number(data, in_place=False):
+        if in_place:
+            return _convert_in_place(data, _to_number)
+        return _to_number(data)
 
     @staticmethod
-    def to_decimal(data):
-        return json.loads(json.dumps(data), parse_float=Decimal)
+    def to_decimal(data, in_place=False):
+        if in_place:
+            return _convert_in_place(data, _to_decimal)
+        return _to_decimal(data)
 
 
 def classproperty(f):